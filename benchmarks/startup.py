@@ -0,0 +1,214 @@
+"""
+Startup benchmark for the cfnplan command line, runs "cfnplan describe" against each of the bundled test templates
+and reports the wall time, then the time to import each cfnplan module in a fresh interpreter. Import times come from
+"-X importtime" where the interpreter supports it (Python 3.7 or later), which also gives the time spent importing
+modules for each template and each module's own import time. Otherwise imports are timed around the import statement.
+A Python 3 interpreter runs a 2to3 converted copy of the package and script.
+
+    $ python benchmarks/startup.py --runs 20 --output startup.json
+    $ python benchmarks/startup.py --compare startup.json
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES = os.path.join(ROOT, 'tests', 'templates')
+
+# Prints the seconds taken to import a module, for interpreters without -X importtime such as Python 2.7
+IMPORT_TIMER = 'import time; start = time.time(); import %s; print(time.time() - start)'
+
+
+def run(command, env, cwd=None):
+    start = time.time()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, cwd=cwd)
+    stdout, stderr = process.communicate()
+    elapsed = time.time() - start
+    if process.returncode != 0:
+        raise RuntimeError('%s failed: %s' % (' '.join(command), stderr.decode('utf-8', 'replace')))
+    return elapsed, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace')
+
+
+def parse_import_times(stderr):
+    """
+    Returns a list of (module name, self microseconds, cumulative microseconds, nesting level) from -X importtime
+    output, where modules imported directly are level 0. A submodule can be listed twice, once where it's imported by
+    its package and once where the package is imported for it.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two more spaces
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(own), int(cumulative), level))
+    return imports
+
+
+def supports_importtime(python):
+    try:
+        run([python, '-X', 'importtime', '-c', 'pass'], None)
+    except RuntimeError:
+        return False
+    return True
+
+
+def _environment(root):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def prepare(python, script, directory):
+    """
+    Finds a script the interpreter can run, converting the package and script with 2to3 into a temporary directory
+    if it's needed.
+    :param directory: Temporary directory to convert into
+    :return: Tuple of (script path, root directory the package is imported from)
+    """
+    script = os.path.abspath(script)
+    root = os.path.dirname(os.path.dirname(script))
+    try:
+        run([python, script, '--help'], _environment(root))
+        return script, root
+    except RuntimeError as e:
+        error = e
+
+    version = run([python, '-c', 'import sys; print(sys.version_info[0])'], None)[1].strip()
+    if version == '2':
+        raise RuntimeError('%s can\'t run %s: %s' % (python, script, error))
+
+    shutil.copytree(os.path.join(root, 'cfnplan'), os.path.join(directory, 'cfnplan'))
+    os.mkdir(os.path.join(directory, 'scripts'))
+    converted = os.path.join(directory, 'scripts', os.path.basename(script))
+    shutil.copy(script, converted)
+    try:
+        run([python, '-m', 'lib2to3', '-n', '-w', '--no-diffs', os.path.join(directory, 'cfnplan'), converted], None)
+        run([python, converted, '--help'], _environment(directory))
+    except RuntimeError as e:
+        # lib2to3 was removed in Python 3.13
+        raise RuntimeError('%s can\'t run a 2to3 converted copy of %s: %s' % (python, script, e))
+    return converted, directory
+
+
+def benchmark(python, script, root, runs, importtime):
+    env = _environment(root)
+    results = {}
+    for name in sorted(os.listdir(TEMPLATES)):
+        command = [python, script, 'describe', os.path.join(TEMPLATES, name)]
+        # The first run compiles and caches bytecode, so isn't counted
+        run(command, env)
+        times = sorted(run(command, env)[0] for _ in range(runs))
+        results[name] = {
+            'min_seconds': times[0],
+            'median_seconds': times[len(times) // 2],
+            'import_microseconds': None,
+            'cfnplan_import_microseconds': None,
+        }
+        if importtime:
+            top_level = [(m, cumulative) for m, _, cumulative, level in
+                         parse_import_times(run([python, '-X', 'importtime'] + command[1:], env)[2]) if level == 0]
+            results[name]['import_microseconds'] = sum(c for _, c in top_level)
+            results[name]['cfnplan_import_microseconds'] = sum(c for m, c in top_level if m.split('.')[0] == 'cfnplan')
+    return results
+
+
+def benchmark_imports(python, root, runs, importtime):
+    """
+    Times importing each cfnplan module in a fresh interpreter
+    :return: Dictionary of module name to {'cumulative_microseconds', 'self_microseconds'} medians, where cumulative
+    is everything the import statement imports and self is None without -X importtime
+    """
+    env = _environment(root)
+    modules = ['cfnplan'] + sorted('cfnplan.' + name[:-3] for name in os.listdir(os.path.join(root, 'cfnplan'))
+                                   if name.endswith('.py') and name != '__init__.py')
+    results = {}
+    for module in modules:
+        if importtime:
+            command = [python, '-X', 'importtime', '-c', 'import %s' % module]
+        else:
+            command = [python, '-c', IMPORT_TIMER % module]
+        # Run from the root as "-c" puts the working directory ahead of PYTHONPATH
+        run(command, env, root)
+        samples = []
+        for _ in range(runs):
+            _, stdout, stderr = run(command, env, root)
+            if importtime:
+                imports = parse_import_times(stderr)
+                samples.append((sum(own for m, own, _, _ in imports if m == module),
+                                sum(cumulative for _, _, cumulative, level in imports if level == 0)))
+            else:
+                samples.append((None, int(float(stdout) * 1000000)))
+        middle = len(samples) // 2
+        results[module] = {
+            'self_microseconds': None if not importtime else sorted(s[0] for s in samples)[middle],
+            'cumulative_microseconds': sorted(s[1] for s in samples)[middle],
+        }
+    return results
+
+
+def format_microseconds(value):
+    return 'n/a' if value is None else '%.1fms' % (value / 1000.0)
+
+
+def report(results, imports, previous):
+    print('%-45s %10s %10s %10s %10s' % ('template', 'min', 'median', 'imports', 'cfnplan'))
+    for name in sorted(results):
+        r = results[name]
+        line = '%-45s %9.1fms %9.1fms %10s %10s' % (
+            name, r['min_seconds'] * 1000, r['median_seconds'] * 1000,
+            format_microseconds(r['import_microseconds']), format_microseconds(r['cfnplan_import_microseconds']))
+        before = previous.get('templates', {}).get(name)
+        if before is not None:
+            line += '  (%+.1fms median)' % ((r['median_seconds'] - before['median_seconds']) * 1000)
+        print(line)
+
+    print()
+    print('%-45s %10s %10s' % ('module', 'import', 'self'))
+    for module in sorted(imports):
+        i = imports[module]
+        line = '%-45s %10s %10s' % (
+            module, format_microseconds(i['cumulative_microseconds']), format_microseconds(i['self_microseconds']))
+        before = previous.get('imports', {}).get(module)
+        if before is not None:
+            line += '  (%+.1fms)' % ((i['cumulative_microseconds'] - before['cumulative_microseconds']) / 1000.0)
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cfnplan startup')
+    parser.add_argument('--python', default=sys.executable, help='Interpreter to run cfnplan with')
+    parser.add_argument('--script', default=os.path.join(ROOT, 'scripts', 'cfnplan'), help='cfnplan script to run')
+    parser.add_argument('--runs', type=int, default=10, help='Number of timed runs per template')
+    parser.add_argument('--output', help='Write the results to a JSON file')
+    parser.add_argument('--compare', help='Compare against results previously written with --output')
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    directory = tempfile.mkdtemp()
+    try:
+        script, root = prepare(args.python, args.script, directory)
+        importtime = supports_importtime(args.python)
+        results = benchmark(args.python, script, root, args.runs, importtime)
+        imports = benchmark_imports(args.python, root, args.runs, importtime)
+    except (OSError, RuntimeError) as e:
+        # Including an interpreter that doesn't exist
+        sys.exit(str(e))
+    finally:
+        shutil.rmtree(directory)
+    report(results, imports, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'templates': results, 'imports': imports}, f, indent=1, sort_keys=True)
@@ -1,2 +1,2 @@
 __version__ = '1.0.1'
-from .template import Template, ElementType
+from .template import Template, ElementType, Direction
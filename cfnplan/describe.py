@@ -0,0 +1,69 @@
+class Describer(object):
+    """
+    Describes the dependencies of many elements, the dependencies of each element are worked out once and shared
+    by every element that depends on it.
+    """
+    def __init__(self):
+        # Element to a tuple of everything it depends on, in depth first order of its direct dependencies
+        self._ordered = {}
+
+    def get_ordered_dependencies(self, element):
+        """
+        Returns a tuple of every element the given element depends on, each direct dependency followed by its own
+        dependencies
+        """
+        if element in self._ordered:
+            return self._ordered[element]
+
+        # Post-order walk so every dependency is ordered before the elements that depend on it
+        in_progress = set([element])
+        stack = [(element, iter(element.get_direct_dependencies()))]
+        while stack:
+            item, pending = stack[-1]
+            d = next(pending, None)
+            if d is None:
+                stack.pop()
+                in_progress.discard(item)
+                found = []
+                seen = set([item])
+                for direct in item.get_direct_dependencies():
+                    for e in (direct,) + self._ordered.get(direct, ()):
+                        if e not in seen:
+                            seen.add(e)
+                            found.append(e)
+                self._ordered[item] = tuple(found)
+            elif d not in self._ordered and d not in in_progress:
+                # Elements already in progress are circular dependencies, which aren't followed
+                in_progress.add(d)
+                stack.append((d, iter(d.get_direct_dependencies())))
+        return self._ordered[element]
+
+    def visit(self, element, callback, verbose=False):
+        """
+        Visit the dependencies of an element, the same as Element.visit_dependencies
+        :param element: Element to describe
+        :param callback: Function to call back with each dependency, its level and whether it's already been visited
+        :param verbose: Whether to visit the full tree, rather than just each dependency once at level 1
+        """
+        if not verbose:
+            for d in self.get_ordered_dependencies(element):
+                callback(d, 1, False)
+            return
+
+        visited = set()
+        path = set([element])
+        stack = [(1, iter(self.get_ordered_dependencies(element)))]
+        parents = [element]
+        while stack:
+            level, pending = stack[-1]
+            d = next(pending, None)
+            if d is None:
+                stack.pop()
+                path.discard(parents.pop())
+                continue
+            callback(d, level, d in visited)
+            visited.add(d)
+            if d not in path:
+                path.add(d)
+                parents.append(d)
+                stack.append((level + 1, iter(self.get_ordered_dependencies(d))))
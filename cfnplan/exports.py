@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+
+from .template import TemplateParser, LogicalIdNotFoundError, TypedLogicalIdNotFoundError, SUB_REFERENCE_PATTERN
+
+INDEX_VERSION = 2
+TEMPLATE_EXTENSIONS = ('.template', '.json')
+DEFAULT_INDEX_NAME = '.cfnplan-index'
+
+
+def resolve_name(raw, stack_name=None):
+    """
+    Resolves an export name expression that only depends on the stack name, e.g. {"Fn::Sub": "${AWS::StackName}-Id"}
+    or {"Fn::Join": ["-", [{"Ref": "AWS::StackName"}, "Id"]]}
+    :param raw: Export name as it appears in the template
+    :param stack_name: Name of the stack the template is deployed as, or None if it isn't known
+    :return: The export name, or None if it can't be resolved
+    """
+    if isinstance(raw, basestring):
+        return raw
+    if not isinstance(raw, dict) or len(raw) != 1:
+        return None
+
+    function, values = list(raw.items())[0]
+    if function == 'Ref':
+        return stack_name if values == 'AWS::StackName' else None
+
+    if function == 'Fn::Join':
+        if not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], list):
+            return None
+        parts = [resolve_name(v, stack_name) for v in values[1]]
+        if not isinstance(values[0], basestring) or None in parts:
+            return None
+        return values[0].join(parts)
+
+    if function == 'Fn::Sub':
+        variables = {}
+        if isinstance(values, list) and len(values) == 2 and isinstance(values[1], dict):
+            values, variables = values
+        if not isinstance(values, basestring):
+            return None
+        resolved = {'AWS::StackName': stack_name}
+        for name, value in variables.items():
+            resolved[name] = resolve_name(value, stack_name)
+        names = SUB_REFERENCE_PATTERN.findall(values)
+        if any(resolved.get(n) is None for n in names):
+            return None
+        return SUB_REFERENCE_PATTERN.sub(lambda m: resolved[m.group(1)], values).replace('${!', '${')
+    return None
+
+
+def _empty_summary():
+    return {'exports': {}, 'imports': {}, 'unresolved_exports': [], 'unresolved_imports': []}
+
+
+def _scan_template(raw, stack_name=None):
+    """
+    Parses a raw template and summarises its exports and imports, this runs in a worker process so only plain
+    values are returned.
+    :param raw: Bytes of the template file
+    :param stack_name: Name of the stack the template is deployed as, to resolve export names that use it
+    :return: Dictionary of 'exports', export name to output logical id, 'imports', export name to a sorted list of
+    the logical ids importing it, and 'unresolved_exports' and 'unresolved_imports', sorted lists of [logical id,
+    raw export name] for names that aren't literals and can't be resolved
+    """
+    summary = _empty_summary()
+    document = json.loads(raw.decode('utf-8'))
+    # Not every JSON file in a repository is a template
+    if not isinstance(document, dict) or 'Resources' not in document:
+        return summary
+
+    parser = TemplateParser()
+    parser.parse_document(document)
+    template = parser.template
+
+    exports = summary['exports']
+    for name, o in template.get_exports().items():
+        exports[name] = o.logical_id
+    for o, raw_name in template.get_unresolved_exports():
+        name = resolve_name(raw_name, stack_name)
+        if name is None:
+            summary['unresolved_exports'].append([o.logical_id, raw_name])
+        else:
+            exports[name] = o.logical_id
+
+    imports = {}
+    for e, raw_name in template.get_imports() + template.get_unresolved_imports():
+        name = resolve_name(raw_name, stack_name)
+        if name is None:
+            summary['unresolved_imports'].append([e.logical_id, raw_name])
+        else:
+            imports.setdefault(name, set()).add(e.logical_id)
+    summary['imports'] = dict((name, sorted(ids)) for name, ids in imports.items())
+    summary['unresolved_exports'].sort(key=lambda x: x[0])
+    summary['unresolved_imports'].sort(key=lambda x: x[0])
+    return summary
+
+
+def _describe_error(error):
+    if isinstance(error, TypedLogicalIdNotFoundError):
+        return 'Logical id %s is not a %s' % (error.logical_id, error.logical_type.__name__)
+    if isinstance(error, LogicalIdNotFoundError):
+        return 'Unknown logical id %s' % error.logical_id
+    return '%s: %s' % (type(error).__name__, error)
+
+
+def _scan_file(path_and_stack_name):
+    """
+    Scans a template file, an invalid template doesn't stop the rest of a directory being indexed so errors are
+    returned rather than raised.
+    :param path_and_stack_name: Tuple of (path, stack name or None)
+    :return: Summary from _scan_template, with 'error' if the template couldn't be parsed
+    """
+    path, stack_name = path_and_stack_name
+    try:
+        with open(path, 'rb') as f:
+            return _scan_template(f.read(), stack_name)
+    except Exception as e:
+        summary = _empty_summary()
+        summary['error'] = _describe_error(e)
+        return summary
+
+
+class ExportIndex(object):
+    """
+    Index of cross-stack exports (Outputs.Export) and imports (Fn::ImportValue) across a directory of templates.
+    """
+    def __init__(self):
+        # Relative template path to {'hash', 'stack_name', 'exports', 'imports', 'unresolved_exports',
+        # 'unresolved_imports'} and 'error' if the template couldn't be parsed
+        self.files = {}
+        self._producers = None
+        self._consumers = None
+
+    @staticmethod
+    def load(path):
+        """
+        Loads an index previously written by save, a missing or outdated index gives an empty index
+        """
+        index = ExportIndex()
+        if os.path.exists(path):
+            with open(path) as f:
+                d = json.load(f)
+            if d.get('version') == INDEX_VERSION:
+                index.files = d['files']
+        return index
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'files': self.files}, f, indent=1, sort_keys=True)
+
+    @staticmethod
+    def _find_templates(directory):
+        found = []
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(TEMPLATE_EXTENSIONS):
+                    found.append(os.path.join(root, name))
+        return found
+
+    def update(self, directory, processes=None, stack_names=None):
+        """
+        Brings the index up to date with the templates in a directory, only templates whose content hash or stack
+        name changed are parsed. Templates that fail to parse are recorded with an error, and not parsed again until
+        they change.
+        :param directory: Directory to (recursively) search for templates
+        :param processes: Number of worker processes to parse with, defaults to the number of CPUs
+        :param stack_names: Dictionary of relative template path to the name of the stack it's deployed as, which
+        resolves export and import names built from AWS::StackName
+        :return: List of relative paths that were (re)parsed
+        """
+        stack_names = stack_names or {}
+        hashes = {}
+        for path in self._find_templates(directory):
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            hashes[os.path.relpath(path, directory).replace(os.sep, '/')] = digest
+
+        changed = sorted(p for p, h in hashes.items() if p not in self.files or self.files[p]['hash'] != h or
+                         self.files[p]['stack_name'] != stack_names.get(p))
+        paths = [(os.path.join(directory, p), stack_names.get(p)) for p in changed]
+
+        if len(paths) > 1 and processes != 1:
+            # Imported here as multiprocessing is slow to import, and often isn't needed for an incremental update
+            import multiprocessing
+            pool = multiprocessing.Pool(min(processes or multiprocessing.cpu_count(), len(paths)))
+            try:
+                results = pool.map(_scan_file, paths)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_scan_file(p) for p in paths]
+
+        for p in list(self.files):
+            if p not in hashes:
+                del self.files[p]
+        for p, entry in zip(changed, results):
+            entry.update(hash=hashes[p], stack_name=stack_names.get(p))
+            self.files[p] = entry
+
+        self._producers = None
+        self._consumers = None
+        return changed
+
+    def _build_lookups(self):
+        if self._producers is not None:
+            return
+        producers = {}
+        consumers = {}
+        for p in sorted(self.files):
+            entry = self.files[p]
+            for name, output_id in sorted(entry['exports'].items()):
+                producers.setdefault(name, []).append((p, output_id))
+            for name, logical_ids in sorted(entry['imports'].items()):
+                consumers.setdefault(name, []).extend((p, i) for i in logical_ids)
+        self._producers = producers
+        self._consumers = consumers
+
+    def errors(self):
+        """
+        Returns a sorted list of (template path, error message) for templates that couldn't be parsed
+        """
+        return sorted((p, e['error']) for p, e in self.files.items() if 'error' in e)
+
+    def unresolved_exports(self):
+        """
+        Returns a sorted list of (template path, output logical id, raw export name) for exports whose name couldn't
+        be resolved, these have no known consumers
+        """
+        return sorted(((p, o, name) for p, e in self.files.items() for o, name in e['unresolved_exports']),
+                      key=lambda x: x[:2])
+
+    def unresolved_imports(self):
+        """
+        Returns a sorted list of (template path, logical id, raw export name) for imports whose name couldn't be
+        resolved, any of these may consume any export
+        """
+        return sorted(((p, i, name) for p, e in self.files.items() for i, name in e['unresolved_imports']),
+                      key=lambda x: x[:2])
+
+    def export_names(self):
+        """
+        Returns a sorted list of every export name that's either produced or consumed
+        """
+        self._build_lookups()
+        return sorted(set(self._producers) | set(self._consumers))
+
+    def producers(self, export_name):
+        """
+        Returns a list of (template path, output logical id) that export the given name
+        """
+        self._build_lookups()
+        return list(self._producers.get(export_name, []))
+
+    def consumers(self, export_name):
+        """
+        Returns a list of (template path, logical id) that import the given name
+        """
+        self._build_lookups()
+        return list(self._consumers.get(export_name, []))
+
+    def dependents_of_output(self, path, output_id):
+        """
+        Returns the consumers that would be affected by changing an output, or an empty list if it isn't exported
+        :param path: Relative path of the template that contains the output
+        :param output_id: Logical id of the output
+        """
+        entry = self.files.get(path)
+        if entry is None:
+            return []
+        for name, o in entry['exports'].items():
+            if o == output_id:
+                return self.consumers(name)
+        return []
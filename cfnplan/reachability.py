@@ -0,0 +1,157 @@
+from .template import CircularDependencyError, ElementType, LogicalIdNotFoundError
+
+
+def _indexes(bits):
+    """
+    Yields the index of every set bit, lowest first
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def _count(bits):
+    return bin(bits).count('1')
+
+
+class ReachabilityMatrix(object):
+    """
+    Transitive dependencies between every pair of logical elements in a template, each row is stored as an int
+    bitset so bulk queries are bitwise operations rather than graph walks.
+    """
+    def __init__(self, template):
+        self.elements = template.get_logical_elements()
+        self._indexes = dict((e.logical_id, i) for i, e in enumerate(self.elements))
+        element_indexes = dict((e, i) for i, e in enumerate(self.elements))
+        direct = [[element_indexes[d] for d in e.get_direct_dependencies() if d in element_indexes]
+                  for e in self.elements]
+
+        self._rows = self._build_rows(direct)
+
+        # Masks of resources by resource type, and all elements by element type
+        self._resource_type_masks = {}
+        self._element_type_masks = {}
+        for i, e in enumerate(self.elements):
+            self._element_type_masks[e.element_type] = self._element_type_masks.get(e.element_type, 0) | (1 << i)
+            if e.element_type == ElementType.resource:
+                mask = self._resource_type_masks.get(e.resource_type, 0)
+                self._resource_type_masks[e.resource_type] = mask | (1 << i)
+
+    def _build_rows(self, direct):
+        """
+        Builds each row in a single depth first pass, rows are completed in topological order so each row is the
+        union of its direct dependencies' rows.
+        """
+        rows = [None] * len(direct)
+        in_progress = set()
+        for start in range(len(direct)):
+            if rows[start] is not None:
+                continue
+            stack = [(start, 0)]
+            in_progress.add(start)
+            while stack:
+                i, position = stack[-1]
+                if position < len(direct[i]):
+                    stack[-1] = (i, position + 1)
+                    d = direct[i][position]
+                    if d in in_progress:
+                        cycle = [self.elements[s].logical_id for s, _ in stack]
+                        raise CircularDependencyError(cycle[[s for s, _ in stack].index(d):])
+                    if rows[d] is None:
+                        in_progress.add(d)
+                        stack.append((d, 0))
+                else:
+                    row = 0
+                    for d in direct[i]:
+                        row |= (1 << d) | rows[d]
+                    rows[i] = row
+                    in_progress.discard(i)
+                    stack.pop()
+        return rows
+
+    def _index(self, logical_id):
+        if logical_id not in self._indexes:
+            raise LogicalIdNotFoundError(logical_id)
+        return self._indexes[logical_id]
+
+    def _row(self, logical_id):
+        return self._rows[self._index(logical_id)]
+
+    def _mask(self, logical_ids):
+        mask = 0
+        for logical_id in logical_ids:
+            mask |= 1 << self._index(logical_id)
+        return mask
+
+    def _ids(self, bits):
+        return [self.elements[i].logical_id for i in _indexes(bits)]
+
+    def resources_of_type(self, resource_type):
+        """
+        Returns the logical ids of every resource of the given type, e.g. AWS::IAM::Role
+        """
+        return self._ids(self._resource_type_masks.get(resource_type, 0))
+
+    def get_dependencies(self, logical_id):
+        """
+        Returns the logical ids the given logical id transitively depends on
+        """
+        return self._ids(self._row(logical_id))
+
+    def depends_on(self, logical_id, dependency_id):
+        return bool(self._row(logical_id) >> self._index(dependency_id) & 1)
+
+    def depends_on_any(self, logical_ids, dependency_ids):
+        """
+        Returns whether any of the logical ids transitively depends on any of the dependency ids
+        """
+        targets = self._mask(dependency_ids)
+        return any(self._row(i) & targets for i in logical_ids)
+
+    def reachable_between(self, logical_ids, dependency_ids):
+        """
+        Returns a list of (logical id, dependency id) for every pair where the first transitively depends on the second
+        """
+        targets = self._mask(dependency_ids)
+        pairs = []
+        for logical_id in logical_ids:
+            for d in self._ids(self._row(logical_id) & targets):
+                pairs.append((logical_id, d))
+        return pairs
+
+    def count_by_resource_type(self, logical_id):
+        """
+        Returns a dictionary of resource type to the number of resources of that type the logical id depends on
+        """
+        row = self._row(logical_id)
+        counts = {}
+        for resource_type, mask in self._resource_type_masks.items():
+            count = _count(row & mask)
+            if count:
+                counts[resource_type] = count
+        return counts
+
+    def count_by_element_type(self, logical_id):
+        """
+        Returns a dictionary of ElementType to the number of elements of that type the logical id depends on
+        """
+        row = self._row(logical_id)
+        counts = {}
+        for element_type, mask in self._element_type_masks.items():
+            count = _count(row & mask)
+            if count:
+                counts[element_type] = count
+        return counts
+
+    def to_numpy(self):
+        """
+        Returns the matrix as a NumPy boolean array where [i, j] is whether elements[i] depends on elements[j],
+        requires numpy to be installed.
+        """
+        import numpy
+        n = len(self.elements)
+        matrix = numpy.zeros((n, n), dtype=bool)
+        for i, row in enumerate(self._rows):
+            matrix[i, list(_indexes(row))] = True
+        return matrix
@@ -0,0 +1,232 @@
+import heapq
+import json
+
+from .template import CircularDependencyError, ElementType
+
+CREATE = 'create'
+UPDATE = 'update'
+REPLACE = 'replace'
+
+# Typical (create, update, replace) seconds per resource type, these are rough and vary by region and configuration
+DEFAULT_DURATIONS = {
+    'AWS::AutoScaling::AutoScalingGroup': (180, 180, 240),
+    'AWS::AutoScaling::LaunchConfiguration': (5, 5, 5),
+    'AWS::CloudFormation::Stack': (300, 300, 300),
+    'AWS::CloudFormation::WaitCondition': (300, 0, 300),
+    'AWS::CloudFormation::WaitConditionHandle': (1, 0, 1),
+    'AWS::CloudFront::Distribution': (1200, 900, 1200),
+    'AWS::DynamoDB::Table': (30, 30, 60),
+    'AWS::EC2::EIP': (10, 10, 10),
+    'AWS::EC2::Instance': (90, 60, 120),
+    'AWS::EC2::InternetGateway': (10, 10, 10),
+    'AWS::EC2::NatGateway': (120, 120, 180),
+    'AWS::EC2::Route': (5, 5, 5),
+    'AWS::EC2::RouteTable': (5, 5, 5),
+    'AWS::EC2::SecurityGroup': (5, 5, 10),
+    'AWS::EC2::Subnet': (5, 5, 10),
+    'AWS::EC2::VPC': (10, 10, 15),
+    'AWS::EC2::VPCGatewayAttachment': (15, 15, 15),
+    'AWS::ECS::Service': (180, 180, 300),
+    'AWS::EKS::Cluster': (720, 600, 900),
+    'AWS::ElastiCache::CacheCluster': (480, 480, 600),
+    'AWS::ElastiCache::ReplicationGroup': (900, 900, 1200),
+    'AWS::Elasticsearch::Domain': (900, 900, 1200),
+    'AWS::ElasticLoadBalancing::LoadBalancer': (30, 30, 45),
+    'AWS::ElasticLoadBalancingV2::LoadBalancer': (180, 60, 240),
+    'AWS::IAM::InstanceProfile': (120, 120, 120),
+    'AWS::IAM::Role': (20, 15, 25),
+    'AWS::Lambda::Function': (15, 10, 20),
+    'AWS::OpenSearchService::Domain': (900, 900, 1200),
+    'AWS::RDS::DBCluster': (600, 600, 900),
+    'AWS::RDS::DBInstance': (600, 600, 900),
+    'AWS::RDS::DBSecurityGroup': (10, 10, 10),
+    'AWS::S3::Bucket': (20, 10, 30),
+    'AWS::SNS::Topic': (5, 5, 5),
+    'AWS::SQS::Queue': (60, 10, 60),
+}
+DEFAULT_DURATION = (30, 30, 45)
+
+_ACTIONS = (CREATE, UPDATE, REPLACE)
+
+
+class DurationModel(object):
+    """
+    Seconds to create, update or replace each resource type
+    """
+    def __init__(self, durations=None, default=DEFAULT_DURATION):
+        """
+        :param durations: Dictionary of resource type to (create, update, replace) seconds, merged over the defaults
+        :param default: (create, update, replace) seconds for types that aren't known
+        """
+        self.durations = dict(DEFAULT_DURATIONS)
+        self.durations.update(durations or {})
+        self.default = default
+
+    @staticmethod
+    def load(path):
+        """
+        Loads a model from a JSON file of {"Type": {"create": 1, "update": 2, "replace": 3}}, the special type
+        "default" sets the duration of unknown types.
+        """
+        with open(path) as f:
+            raw = json.load(f)
+
+        default = DEFAULT_DURATION
+        durations = {}
+        for resource_type, values in raw.items():
+            base = DEFAULT_DURATIONS.get(resource_type, DEFAULT_DURATION)
+            duration = tuple(values.get(a, b) for a, b in zip(_ACTIONS, base))
+            if resource_type == 'default':
+                default = duration
+            else:
+                durations[resource_type] = duration
+        return DurationModel(durations, default)
+
+    def duration(self, resource_type, action):
+        return self.durations.get(resource_type, self.default)[_ACTIONS.index(action)]
+
+
+class Wave(object):
+    """
+    Resources at the same depth of the dependency graph, i.e. those that can start once the previous wave's
+    dependencies are done. Only resources being created, updated or replaced are counted.
+    """
+    def __init__(self, depth):
+        self.depth = depth
+        self.resources = []
+        self.start = None
+        self.end = None
+        self.busy = 0
+
+    @property
+    def utilisation(self):
+        """
+        Fraction of the wave's span its resources spent working, 1.0 means they all ran for the whole span and 0.0
+        that no time was spent
+        """
+        span = self.end - self.start
+        if span <= 0 or not self.resources:
+            return 0.0
+        return float(self.busy) / (span * len(self.resources))
+
+
+class SimulationResult(object):
+    def __init__(self):
+        self.total_time = 0
+        # Resource to (action or None, start, end) seconds
+        self.timings = {}
+        # Changed resources on the path that finished last, first to last
+        self.slowest_chain = []
+        self.waves = []
+        # Resources without an action, these take no time and aren't in the chain or waves
+        self.unchanged = []
+
+
+class DeploySimulator(object):
+    """
+    Replays a stack create or update over the resource graph, every resource starts as soon as all the resources it
+    depends on are complete, as CloudFormation does.
+    """
+    def __init__(self, template, model=None):
+        self.model = model or DurationModel()
+        self.resources = [e for e in template.get_logical_elements() if e.element_type == ElementType.resource]
+        self.dependencies = dict((r, self._get_resource_dependencies(r)) for r in self.resources)
+
+    @staticmethod
+    def _get_resource_dependencies(resource):
+        """
+        Returns the resources a resource depends on, following through conditions and other logical elements that
+        don't take time to deploy
+        """
+        found = []
+        seen = set()
+        pending = list(resource.get_direct_dependencies())
+        while pending:
+            d = pending.pop()
+            if d in seen or d is resource:
+                continue
+            seen.add(d)
+            if d.element_type == ElementType.resource:
+                found.append(d)
+            else:
+                pending.extend(d.get_direct_dependencies())
+        return found
+
+    def simulate_create(self):
+        return self._simulate(dict((r.logical_id, CREATE) for r in self.resources))
+
+    def simulate_update(self, changes):
+        """
+        :param changes: Dictionary of logical id to UPDATE or REPLACE, other resources are unchanged
+        """
+        return self._simulate(changes)
+
+    def _simulate(self, actions):
+        result = SimulationResult()
+        dependents = dict((r, []) for r in self.resources)
+        waiting = {}
+        for r in self.resources:
+            waiting[r] = len(self.dependencies[r])
+            for d in self.dependencies[r]:
+                dependents[d].append(r)
+
+        depth = {}
+        # The dependency that finished last, so the slowest chain can be followed back
+        critical = {}
+        events = []
+        sequence = 0
+
+        def start(r, now):
+            action = actions.get(r.logical_id)
+            duration = self.model.duration(r.resource_type, action) if action else 0
+            result.timings[r] = (action, now, now + duration)
+            heapq.heappush(events, (now + duration, sequence, r))
+
+        for r in self.resources:
+            if waiting[r] == 0:
+                depth[r] = 0
+                start(r, 0)
+                sequence += 1
+
+        finished = 0
+        now = 0
+        while events:
+            now, _, r = heapq.heappop(events)
+            finished += 1
+            for dependent in dependents[r]:
+                waiting[dependent] -= 1
+                # Unchanged resources don't start a new wave
+                step = 1 if result.timings[r][0] else 0
+                depth[dependent] = max(depth.get(dependent, 0), depth[r] + step)
+                if waiting[dependent] == 0:
+                    critical[dependent] = r
+                    start(dependent, now)
+                    sequence += 1
+
+        if finished != len(self.resources):
+            raise CircularDependencyError(sorted(r.logical_id for r in self.resources if waiting[r] > 0))
+
+        result.total_time = now
+        changed = [r for r in self.resources if result.timings[r][0]]
+        result.unchanged = [r for r in self.resources if not result.timings[r][0]]
+        if changed:
+            r = max(changed, key=lambda x: result.timings[x][2])
+            chain = []
+            while r is not None:
+                if result.timings[r][0]:
+                    chain.append(r)
+                r = critical.get(r)
+            result.slowest_chain = list(reversed(chain))
+
+        waves = {}
+        for r in changed:
+            wave = waves.get(depth[r])
+            if wave is None:
+                wave = waves[depth[r]] = Wave(depth[r])
+            _, started, ended = result.timings[r]
+            wave.resources.append(r)
+            wave.start = started if wave.start is None else min(wave.start, started)
+            wave.end = ended if wave.end is None else max(wave.end, ended)
+            wave.busy += ended - started
+        result.waves = [waves[k] for k in sorted(waves)]
+        return result
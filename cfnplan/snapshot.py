@@ -0,0 +1,242 @@
+"""
+Compact binary snapshots of a template's logical dependency graph.
+
+A snapshot is a header followed by sections of little-endian unsigned 32 bit integers and a string blob:
+
+ 1. String offsets (string count + 1), the byte offsets of each interned string within the blob
+ 2. Nodes (node count * 3), the logical id string, element type and resource type string (or NO_STRING)
+ 3. Forward offsets (node count + 1) and forward edges (edge count), the CSR dependencies of each node
+ 4. Reverse offsets (node count + 1) and reverse edges (edge count), the CSR dependents of each node
+ 5. UTF-8 string blob
+
+Nodes are sorted by logical id so they can be looked up with a binary search, without decoding any other node.
+"""
+from array import array
+import mmap
+import struct
+import sys
+
+from .template import Template, ElementType, LogicalIdNotFoundError, Resource, Parameter, Condition, \
+    PseudoParameter, Mapping, Output
+
+MAGIC = b'CFNG'
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<4sIIII')
+_U32 = struct.Struct('<I')
+
+
+class SnapshotFormatError(Exception):
+    pass
+
+
+def _u32_array(values):
+    a = array('I', values)
+    if a.itemsize != 4:
+        raise SnapshotFormatError('Unsigned int must be 4 bytes, got %d' % a.itemsize)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+
+def _csr(adjacency):
+    offsets = [0]
+    edges = []
+    for targets in adjacency:
+        edges.extend(targets)
+        offsets.append(len(edges))
+    return offsets, edges
+
+
+def write_snapshot(template, f):
+    """
+    Writes the logical graph of a template to a binary file
+    :param template: Parsed template
+    :param f: File object opened in binary mode
+    """
+    elements = sorted(template.get_logical_elements(), key=lambda e: e.logical_id)
+    indexes = dict((e, i) for i, e in enumerate(elements))
+
+    strings = []
+    string_indexes = {}
+
+    def string_index(value):
+        if value is None:
+            return NO_STRING
+        if value not in string_indexes:
+            string_indexes[value] = len(strings)
+            strings.append(value)
+        return string_indexes[value]
+
+    nodes = []
+    forward = []
+    reverse = [[] for _ in elements]
+    for i, e in enumerate(elements):
+        nodes.extend((string_index(e.logical_id), e.element_type.value, string_index(getattr(e, 'resource_type', None))))
+        targets = sorted(indexes[d] for d in e.get_direct_dependencies() if d in indexes)
+        forward.append(targets)
+        for t in targets:
+            reverse[t].append(i)
+
+    blob = [s.encode('utf-8') for s in strings]
+    string_offsets = [0]
+    for b in blob:
+        string_offsets.append(string_offsets[-1] + len(b))
+
+    forward_offsets, forward_edges = _csr(forward)
+    reverse_offsets, reverse_edges = _csr(reverse)
+
+    f.write(_HEADER.pack(MAGIC, VERSION, len(elements), len(strings), len(forward_edges)))
+    for section in (string_offsets, nodes, forward_offsets, forward_edges, reverse_offsets, reverse_edges):
+        _u32_array(section).tofile(f)
+    f.write(b''.join(blob))
+
+
+class GraphSnapshot(object):
+    """
+    Read-only view over a snapshot, nodes are addressed by index and only decoded when accessed.
+    """
+    def __init__(self, data):
+        """
+        :param data: Bytes or mmap of the snapshot
+        """
+        self._data = data
+        self._mmap = None
+        self._file = None
+
+        magic, version, self._node_count, self._string_count, self._edge_count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotFormatError('Not a version %d snapshot' % VERSION)
+
+        n = self._node_count
+        position = _HEADER.size
+        self._string_offsets = position
+        position += 4 * (self._string_count + 1)
+        self._nodes = position
+        position += 4 * 3 * n
+        self._forward_offsets = position
+        position += 4 * (n + 1)
+        self._forward_edges = position
+        position += 4 * self._edge_count
+        self._reverse_offsets = position
+        position += 4 * (n + 1)
+        self._reverse_edges = position
+        position += 4 * self._edge_count
+        self._blob = position
+
+    @staticmethod
+    def open(path):
+        """
+        Memory maps a snapshot file
+        """
+        f = open(path, 'rb')
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            snapshot = GraphSnapshot(m)
+        except Exception:
+            f.close()
+            raise
+        snapshot._mmap = m
+        snapshot._file = f
+        return snapshot
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._node_count
+
+    def _u32(self, position):
+        return _U32.unpack_from(self._data, position)[0]
+
+    def _u32s(self, position, count):
+        return struct.unpack_from('<%dI' % count, self._data, position)
+
+    def _string(self, index):
+        start, end = self._u32s(self._string_offsets + 4 * index, 2)
+        return self._data[self._blob + start:self._blob + end].decode('utf-8')
+
+    def _targets(self, offsets, edges, index):
+        start, end = self._u32s(offsets + 4 * index, 2)
+        return self._u32s(edges + 4 * start, end - start)
+
+    def logical_id(self, index):
+        return self._string(self._u32(self._nodes + 12 * index))
+
+    def element_type(self, index):
+        return ElementType(self._u32(self._nodes + 12 * index + 4))
+
+    def resource_type(self, index):
+        s = self._u32(self._nodes + 12 * index + 8)
+        return None if s == NO_STRING else self._string(s)
+
+    def index_of(self, logical_id):
+        """
+        Returns the node index of a logical id
+        """
+        low, high = 0, self._node_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.logical_id(middle) < logical_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._node_count or self.logical_id(low) != logical_id:
+            raise LogicalIdNotFoundError(logical_id)
+        return low
+
+    def dependency_indexes(self, index):
+        return self._targets(self._forward_offsets, self._forward_edges, index)
+
+    def dependent_indexes(self, index):
+        return self._targets(self._reverse_offsets, self._reverse_edges, index)
+
+    def get_dependencies(self, logical_id):
+        """
+        Returns the logical ids the given logical id directly depends on
+        """
+        return [self.logical_id(i) for i in self.dependency_indexes(self.index_of(logical_id))]
+
+    def get_dependents(self, logical_id):
+        """
+        Returns the logical ids that directly depend on the given logical id
+        """
+        return [self.logical_id(i) for i in self.dependent_indexes(self.index_of(logical_id))]
+
+    def to_template(self):
+        """
+        Builds a frozen template containing every logical element and its direct dependencies, this decodes every
+        node.
+        """
+        types = {
+            ElementType.resource: Resource,
+            ElementType.parameter: Parameter,
+            ElementType.condition: Condition,
+            ElementType.pseudo_parameter: PseudoParameter,
+            ElementType.mapping: Mapping,
+            ElementType.output: Output,
+        }
+
+        template = Template()
+        elements = []
+        for i in range(self._node_count):
+            e = types[self.element_type(i)](self.logical_id(i))
+            if e.element_type == ElementType.resource:
+                e.resource_type = self.resource_type(i)
+            template.add_element(e)
+            elements.append(e)
+        for i, e in enumerate(elements):
+            for d in self.dependency_indexes(i):
+                e.add_dependency(elements[d])
+        return template.freeze()
@@ -0,0 +1,198 @@
+import httplib
+import json
+import os
+import socket
+import threading
+import urllib
+import urlparse
+from Queue import Queue, Empty
+
+from .template import TemplateParser
+
+
+class TemplateFetchError(Exception):
+    def __init__(self, location, status):
+        self.location = location
+        self.status = status
+
+
+class FetchResult(object):
+    """
+    The raw content of a template, plus any validators that allow it to be conditionally fetched again
+    """
+    def __init__(self, content, etag=None, last_modified=None, not_modified=False):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+
+class FileSource(object):
+    """
+    Reads templates from local paths or file:// URLs
+    """
+    def fetch(self, location, previous=None):
+        parsed = urlparse.urlparse(location)
+        path = urllib.url2pathname(parsed.path) if parsed.scheme == 'file' else location
+
+        stat = os.stat(path)
+        last_modified = '%r:%d' % (stat.st_mtime, stat.st_size)
+        if previous is not None and previous.last_modified == last_modified:
+            return FetchResult(previous.content, last_modified=last_modified, not_modified=True)
+        with open(path, 'rb') as f:
+            return FetchResult(f.read(), last_modified=last_modified)
+
+
+class HttpSource(object):
+    """
+    Fetches templates over http(s), keeping idle connections open per host so they're reused between requests
+    """
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+        connection_type = httplib.HTTPSConnection if scheme == 'https' else httplib.HTTPConnection
+        return connection_type(netloc, timeout=self.timeout), False
+
+    def _release(self, scheme, netloc, connection):
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(connection)
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for c in connections:
+                    c.close()
+            self._idle = {}
+
+    def fetch(self, location, previous=None):
+        parsed = urlparse.urlparse(location)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+
+        headers = {}
+        if previous is not None:
+            if previous.etag is not None:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified is not None:
+                headers['If-Modified-Since'] = previous.last_modified
+
+        while True:
+            connection, reused = self._acquire(parsed.scheme, parsed.netloc)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (httplib.HTTPException, socket.error):
+                connection.close()
+                # The server may have closed an idle keep-alive connection, so retry once on a new one
+                if reused:
+                    continue
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(parsed.scheme, parsed.netloc, connection)
+
+        if response.status == 304 and previous is not None:
+            return FetchResult(previous.content, previous.etag, previous.last_modified, not_modified=True)
+        if response.status != 200:
+            raise TemplateFetchError(location, response.status)
+        return FetchResult(content, response.getheader('etag'), response.getheader('last-modified'))
+
+
+class SourceLoader(object):
+    """
+    Loads templates from pluggable sources by URL scheme, remembering what was fetched so unchanged templates
+    aren't transferred or parsed again.
+    """
+    def __init__(self, max_concurrency=8):
+        self.max_concurrency = max_concurrency
+        self.sources = {
+            '': FileSource(),
+            'file': FileSource(),
+        }
+        http = HttpSource()
+        self.sources['http'] = http
+        self.sources['https'] = http
+
+        # Location to (FetchResult, Template) of the last load
+        self._loaded = {}
+
+    def register(self, scheme, source):
+        """
+        Registers a source for a URL scheme, the source must have a fetch(location, previous) method that returns a
+        FetchResult
+        """
+        self.sources[scheme] = source
+
+    def close(self):
+        for source in self.sources.values():
+            if hasattr(source, 'close'):
+                source.close()
+
+    def _get_source(self, location):
+        scheme = urlparse.urlparse(location).scheme
+        # Single letters are Windows drive letters rather than schemes
+        if len(scheme) <= 1:
+            scheme = ''
+        return self.sources[scheme]
+
+    def load(self, location):
+        """
+        Loads and parses the template at a location, a path or URL
+        """
+        previous = self._loaded.get(location)
+        result = self._get_source(location).fetch(location, previous[0] if previous else None)
+        if result.not_modified and previous is not None:
+            template = previous[1]
+        else:
+            parser = TemplateParser()
+            parser.parse_document(json.loads(result.content.decode('utf-8')))
+            template = parser.template
+        self._loaded[location] = (result, template)
+        return template
+
+    def load_many(self, locations):
+        """
+        Loads many templates concurrently, with at most max_concurrency fetches in flight
+        :return: Dictionary of location to template
+        """
+        locations = list(locations)
+        work = Queue()
+        for location in locations:
+            work.put(location)
+
+        templates = {}
+        errors = []
+
+        def worker():
+            while not errors:
+                try:
+                    location = work.get_nowait()
+                except Empty:
+                    return
+                try:
+                    templates[location] = self.load(location)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(min(self.max_concurrency, len(locations)))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+
+        if errors:
+            raise errors[0]
+        return templates
@@ -0,0 +1,172 @@
+import io
+import json
+import re
+
+WHITESPACE = ' \t\r\n'
+NUMBER_START = '-0123456789'
+VALUE_END = WHITESPACE + ',}]'
+
+# Characters that matter when skipping over a value: brackets and quotes outside strings, quotes and escapes inside
+_STRUCTURE = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,}\]]')
+
+
+class _ChunkedReader(object):
+    """
+    Reads JSON tokens and values from a file a chunk at a time, discarding what's been consumed
+    """
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Read at least as much as is buffered so a large value is rescanned a logarithmic number of times
+        remaining = self.buffer[self.position:]
+        chunk = self.f.read(max(self.chunk_size, len(remaining)))
+        if not chunk:
+            self.eof = True
+        self.buffer = remaining + chunk
+        self.position = 0
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it, or an empty string at the end of the file
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ''
+            self._fill()
+
+    def expect(self, token):
+        actual = self.peek()
+        if actual != token:
+            raise ValueError('Expected %r but found %r' % (token, actual))
+        self.position += 1
+
+    def value(self):
+        """
+        Decodes the next complete JSON value
+        """
+        first = self.peek()
+        is_number = first != '' and first in NUMBER_START
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # A number may continue in the next chunk, e.g. "1." decodes as 1, so it's only complete when followed
+            # by something that ends a value
+            if is_number and not self.eof and (end == len(self.buffer) or self.buffer[end] not in VALUE_END):
+                self._fill()
+                continue
+            self.position = end
+            return value
+
+    def skip(self):
+        """
+        Moves past the next JSON value without decoding it, only brackets, quotes and escapes are matched so the
+        value isn't validated
+        """
+        if self.peek() not in '{["':
+            # Numbers, true, false and null
+            while True:
+                m = _SCALAR_END.search(self.buffer, self.position)
+                if m is not None:
+                    self.position = m.start()
+                    return
+                self.position = len(self.buffer)
+                if self.eof:
+                    return
+                self._fill()
+
+        depth = 0
+        in_string = False
+        while True:
+            m = (_STRING_END if in_string else _STRUCTURE).search(self.buffer, self.position)
+            if m is None:
+                if self.eof:
+                    raise ValueError('Unterminated JSON value')
+                # Nothing buffered is needed any more, so it's dropped rather than kept across the read
+                self.position = len(self.buffer)
+                self._fill()
+                continue
+
+            c = m.group()
+            if c == '\\':
+                if m.end() == len(self.buffer) and not self.eof:
+                    # The escaped character is in the next chunk
+                    self.position = m.start()
+                    self._fill()
+                    continue
+                self.position = m.end() + 1
+                continue
+
+            self.position = m.end()
+            if c == '"':
+                in_string = not in_string
+            elif c in '{[':
+                depth += 1
+            else:
+                depth -= 1
+            if depth == 0 and not in_string:
+                return
+
+
+def iter_top_level(f, sections, chunk_size=65536, skip_entries=False):
+    """
+    Iterates over a JSON object read from a file, one value at a time.
+    :param f: File opened in text mode
+    :param sections: Top level keys whose (object) values are iterated entry by entry rather than decoded whole
+    :param chunk_size: Minimum number of characters to read at a time
+    :param skip_entries: Whether to skip over the values of section entries without decoding them, they're None
+    :return: Generator of (key, entry key, value), where entry key is None for top level values not in sections
+    """
+    reader = _ChunkedReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key in sections and reader.peek() == '{':
+            reader.expect('{')
+            if reader.peek() != '}':
+                while True:
+                    entry_key = reader.value()
+                    reader.expect(':')
+                    if skip_entries:
+                        reader.skip()
+                        yield key, entry_key, None
+                    else:
+                        yield key, entry_key, reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect('}')
+        else:
+            yield key, None, reader.value()
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
+
+
+def iter_file(path, sections, chunk_size=65536, skip_entries=False):
+    """
+    Iterates over the top level of a JSON file, see iter_top_level
+    """
+    with io.open(path, encoding='utf-8') as f:
+        for item in iter_top_level(f, sections, chunk_size, skip_entries):
+            yield item
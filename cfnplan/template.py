@@ -1,6 +1,13 @@
 import json
+import re
+from collections import deque
 from enum import Enum
 
+from .stream import iter_file
+
+# Matches ${Name} and ${Name.Attribute} references in a Fn::Sub string, ${!Literal} is an escape and isn't matched
+SUB_REFERENCE_PATTERN = re.compile(r'\$\{([^!}][^}]*)\}')
+
 
 class LogicalIdNotFoundError(Exception):
     def __init__(self, logical_id):
@@ -13,6 +20,16 @@ class TypedLogicalIdNotFoundError(Exception):
         self.logical_type = logical_type
 
 
+class CircularDependencyError(Exception):
+    def __init__(self, logical_ids):
+        self.logical_ids = logical_ids
+
+
+class FrozenTemplateError(Exception):
+    def __init__(self, item):
+        self.item = item
+
+
 class ElementType(Enum):
     """
     Types of cloud formation elements, includes resources, parameters, simple types and functions
@@ -31,15 +48,56 @@ class ElementType(Enum):
     output = 11
 
 
+class Direction(Enum):
+    """
+    Direction to follow dependencies in, towards what an element depends on or towards what depends on it
+    """
+    dependencies = 0
+    dependents = 1
+
+
 class Element(object):
     """
-    Represents a value in cloud formation, may be simple or complex like a function
+    Represents a value in cloud formation, may be simple or complex like a function.
+    Once frozen the element can't be changed, its children and dependencies are tuples and derived data is cached so
+    it can be shared between threads.
     """
     def __init__(self, element_type):
         self.element_type = element_type
         self.children = []
         self.dependencies = []
 
+    @property
+    def frozen(self):
+        return isinstance(self, _FrozenElement)
+
+    def _set_cached(self, name, value):
+        # Caches are only set on frozen elements, racing threads compute identical values so the last write wins
+        self.__dict__[name] = value
+        return value
+
+    def freeze(self):
+        """
+        Makes the element and its children immutable
+        """
+        stack = [self]
+        while stack:
+            e = stack.pop()
+            # Children of a frozen element are already frozen
+            if not isinstance(e, _FrozenElement):
+                stack.extend(e.children)
+                _freeze_element(e)
+
+    def _thaw(self, copies):
+        """
+        Makes a copy of a frozen element mutable, pointing it at the copies of its children and dependencies
+        """
+        object.__setattr__(self, '__class__', self.__class__.thawed_class)
+        for name in ('_all_dependencies', '_direct_dependencies'):
+            self.__dict__.pop(name, None)
+        self.children = [copies[c] for c in self.children]
+        self.dependencies = [copies.get(d, d) for d in self.dependencies]
+
     def add_dependency(self, element):
         self.dependencies.append(element)
 
@@ -62,8 +120,12 @@ class Element(object):
 
     def get_all_dependencies(self):
         """
-        Returns a list of all the dependencies, including those children have.
+        Returns a set of all the dependencies, including those children have. This is a frozenset once frozen.
         """
+        cached = self.__dict__.get('_all_dependencies')
+        if cached is not None:
+            return cached
+
         visited = set()
 
         def visit(item):
@@ -75,8 +137,35 @@ class Element(object):
                 visit(c)
 
         visit(self)
+        if self.frozen:
+            return self._set_cached('_all_dependencies', frozenset(visited))
         return visited
 
+    def get_direct_dependencies(self):
+        """
+        Returns a list of the elements directly referenced by the element or its children, without following
+        those elements' own dependencies. This is a tuple once frozen.
+        """
+        cached = self.__dict__.get('_direct_dependencies')
+        if cached is not None:
+            return cached
+
+        found = []
+        seen = set()
+
+        def visit(item):
+            for d in item.dependencies:
+                if d not in seen:
+                    seen.add(d)
+                    found.append(d)
+            for c in item.children:
+                visit(c)
+
+        visit(self)
+        if self.frozen:
+            return self._set_cached('_direct_dependencies', tuple(found))
+        return found
+
     def visit_dependencies(self, callback):
         """
         Visit all the dependencies the element has.
@@ -95,6 +184,46 @@ class Element(object):
         visit(0, self)
 
 
+class _FrozenElement(object):
+    """
+    Mixed into the class of a frozen element, every change raises FrozenTemplateError
+    """
+    # The element's class before it was frozen
+    thawed_class = None
+
+    def __setattr__(self, name, value):
+        raise FrozenTemplateError(self)
+
+    def add_dependency(self, element):
+        raise FrozenTemplateError(self)
+
+    def add_child(self, element):
+        raise FrozenTemplateError(self)
+
+    def add_children(self, elements):
+        raise FrozenTemplateError(self)
+
+
+# Element class to its frozen subclass
+_frozen_classes = {}
+
+
+def _freeze_element(element):
+    """
+    Freezes a single element, but not its children
+    """
+    d = element.__dict__
+    d['children'] = tuple(d['children'])
+    d['dependencies'] = tuple(d['dependencies'])
+    element_class = element.__class__
+    frozen_class = _frozen_classes.get(element_class)
+    if frozen_class is None:
+        frozen_class = type(element_class.__name__, (_FrozenElement, element_class), {'thawed_class': element_class})
+        _frozen_classes[element_class] = frozen_class
+    # Assignments are only checked once frozen, so building a template doesn't pay for the check
+    element.__class__ = frozen_class
+
+
 class Property(Element):
     """
     Represents a property, e.g. key = value
@@ -127,6 +256,8 @@ class Function(Element):
     def __init__(self, name):
         super(Function, self).__init__(ElementType.function)
         self.name = name
+        # Export name a Fn::ImportValue imports, as it appears in the template
+        self.import_name = None
 
 
 class LogicalElement(Element):
@@ -182,11 +313,60 @@ class Mapping(LogicalElement):
 class Output(LogicalElement):
     def __init__(self, logical_id):
         super(Output, self).__init__(logical_id, ElementType.output)
+        # Literal export name, or None if the output isn't exported or its name is an expression
+        self.export_name = None
+        # Export name as it appears in the template, e.g. {"Fn::Sub": "${AWS::StackName}-VpcId"}
+        self.raw_export_name = None
+
+
+class SubGraph(object):
+    """
+    A slice of a template's logical elements reachable from some root elements, in a single direction.
+    """
+    def __init__(self, roots, direction):
+        self.roots = roots
+        self.direction = direction
+        # Elements in breadth first order, including the roots
+        self.elements = []
+        # Element to the level it was first reached at, roots are level 0
+        self.levels = {}
+        # Element to the adjacent elements within the slice
+        self.edges = {}
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, element):
+        return element in self.levels
+
+    def get_logical_ids(self):
+        return [e.logical_id for e in self.elements]
+
+    def visit(self, root, callback):
+        """
+        Visit the tree of elements under a root in the slice, mirroring Element.visit_dependencies
+        :param root: Root element to start from
+        :param callback: Function to call back for every element with the element, its level and whether it's
+        already been visited
+        """
+        visited = set()
+
+        def visit(level, item):
+            is_visited = item in visited
+            visited.add(item)
+            if item is not root:
+                callback(item, level, is_visited)
+            if not is_visited:
+                for e in self.edges.get(item, []):
+                    visit(level + 1, e)
+
+        visit(0, root)
 
 
 class Template(object):
     """
     Represents an entire template.
+    Parsed templates are frozen, so one template can be queried from many threads. Use thaw to get a mutable copy.
     """
     def __init__(self):
         self.version = None
@@ -195,6 +375,50 @@ class Template(object):
 
         # Logical elements by key, this is a cache for elements
         self._logical_elements = {}
+        # Logical element to the logical elements that directly depend on it, built on first use
+        self._dependents = None
+        self._frozen = False
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise FrozenTemplateError(self)
+        super(Template, self).__setattr__(name, value)
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    def freeze(self):
+        """
+        Makes the template and all of its elements immutable
+        :return: The template
+        """
+        if self._frozen:
+            return self
+        for e in self.elements:
+            e.freeze()
+        self.elements = tuple(self.elements)
+        self._frozen = True
+        return self
+
+    def thaw(self):
+        """
+        Returns a mutable copy of the template, which can be frozen again once changed
+        """
+        import copy
+        copies = {}
+        for e in self.elements:
+            for c in e.get_all_children():
+                copies[c] = copy.copy(c)
+        for c in copies.values():
+            c._thaw(copies)
+
+        template = Template()
+        template.version = self.version
+        template.description = self.description
+        for e in self.elements:
+            template.add_element(copies[e])
+        return template
 
     def get_by_logical_id(self, logical_id):
         """
@@ -214,9 +438,123 @@ class Template(object):
         return self.get_by_logical_id_typed(logical_id, Resource)
 
     def add_element(self, element):
+        if self._frozen:
+            raise FrozenTemplateError(self)
         if isinstance(element, LogicalElement):
             self._logical_elements[element.logical_id] = element
         self.elements.append(element)
+        self._dependents = None
+
+    def get_dependents(self, element):
+        """
+        Returns the logical elements that directly depend on the given element
+        """
+        dependents = self._dependents
+        if dependents is None:
+            # Set directly as a frozen template can still cache this, racing threads build identical indexes
+            dependents = self.__dict__['_dependents'] = self._build_dependents()
+        return dependents.get(element, ())
+
+    def _build_dependents(self):
+        dependents = {}
+        for e in self.get_logical_elements():
+            for d in e.get_direct_dependencies():
+                dependents.setdefault(d, []).append(e)
+        return dict((k, tuple(v)) for k, v in dependents.items())
+
+    def subgraph(self, logical_ids, direction=Direction.dependencies, depth=None):
+        """
+        Extracts the logical elements reachable from the given logical ids, only the elements in the slice are visited
+        when following dependencies; following dependents indexes the template once, on first use.
+        :param logical_ids: Logical ids of the root elements
+        :param direction: Whether to follow dependencies or dependents
+        :param depth: Maximum number of edges to follow from a root, or None for no limit
+        :return: A SubGraph
+        """
+        if direction == Direction.dependents:
+            adjacent = self.get_dependents
+        else:
+            adjacent = Element.get_direct_dependencies
+
+        roots = [self.get_by_logical_id(i) for i in logical_ids]
+        view = SubGraph(roots, direction)
+        queue = deque()
+        for r in roots:
+            if r not in view.levels:
+                view.levels[r] = 0
+                view.elements.append(r)
+                queue.append(r)
+
+        while queue:
+            e = queue.popleft()
+            level = view.levels[e]
+            if depth is not None and level >= depth:
+                continue
+            edges = adjacent(e)
+            view.edges[e] = edges
+            for a in edges:
+                if a not in view.levels:
+                    view.levels[a] = level + 1
+                    view.elements.append(a)
+                    queue.append(a)
+        return view
+
+    def get_exports(self):
+        """
+        Returns a dictionary of export name to the output that exports it, only literal export names are included.
+        """
+        return dict((e.export_name, e) for e in self.elements
+                    if e.element_type == ElementType.output and e.export_name is not None)
+
+    def get_unresolved_exports(self):
+        """
+        Returns a list of (output, raw export name) for exports whose name isn't a literal, e.g.
+        {"Fn::Sub": "${AWS::StackName}-VpcId"}
+        """
+        return [(e, e.raw_export_name) for e in self.elements
+                if e.element_type == ElementType.output and e.raw_export_name is not None and e.export_name is None]
+
+    def _get_import_names(self):
+        for e in self.get_logical_elements():
+            for c in e.get_all_children():
+                if c.element_type == ElementType.function and c.name == 'Fn::ImportValue':
+                    yield e, c.import_name
+
+    def get_imports(self):
+        """
+        Returns a list of (logical element, export name) for every Fn::ImportValue of a literal export name.
+        """
+        return [(e, name) for e, name in self._get_import_names() if isinstance(name, basestring)]
+
+    def get_unresolved_imports(self):
+        """
+        Returns a list of (logical element, raw export name) for every Fn::ImportValue of an export name that isn't
+        a literal, e.g. {"Fn::Sub": "${NetworkStack}-VpcId"}
+        """
+        return [(e, name) for e, name in self._get_import_names() if not isinstance(name, basestring)]
+
+    def get_logical_elements(self):
+        """
+        Returns a list of every logical element (resources, parameters, outputs, etc) in the template
+        """
+        return [e for e in self.elements if isinstance(e, LogicalElement)]
+
+    def save_snapshot(self, path):
+        """
+        Writes the logical dependency graph to a compact binary snapshot, see cfnplan.snapshot
+        """
+        from .snapshot import write_snapshot
+        with open(path, 'wb') as f:
+            write_snapshot(self, f)
+
+    @staticmethod
+    def load_snapshot(path):
+        """
+        Opens a snapshot written by save_snapshot, nodes are only decoded as they're accessed
+        :return: A GraphSnapshot, which should be closed when no longer needed
+        """
+        from .snapshot import GraphSnapshot
+        return GraphSnapshot.open(path)
 
     @staticmethod
     def parse_file(path):
@@ -224,6 +562,15 @@ class Template(object):
         parser.parse_file(path)
         return parser.template
 
+    @staticmethod
+    def parse_file_incremental(path):
+        """
+        Parses a template file with memory bounded by its largest section entry rather than the whole file
+        """
+        parser = TemplateParser()
+        parser.parse_file_incremental(path)
+        return parser.template
+
     @staticmethod
     def parse_string(raw_string):
         parser = TemplateParser()
@@ -231,6 +578,16 @@ class Template(object):
         return parser.template
 
 
+# Top level sections that declare logical elements, in the order they're created
+LOGICAL_SECTIONS = (
+    (Parameter, 'Parameters'),
+    (Mapping, 'Mappings'),
+    (Condition, 'Conditions'),
+    (Resource, 'Resources'),
+    (Output, 'Outputs'),
+)
+
+
 class TemplateParser(object):
     """
     Parses template JSON into a template
@@ -250,16 +607,27 @@ class TemplateParser(object):
             'Fn::Not': self._handle_function,
             'Fn::Or': self._handle_function,
             'Fn::Equals': self._handle_function,
+            'Fn::ImportValue': self._handle_function_import_value,
+            'Fn::Sub': self._handle_function_sub,
+            'Fn::Split': self._handle_function,
+            'Fn::Cidr': self._handle_function,
+            'Fn::Transform': self._handle_function,
+            'Fn::Length': self._handle_function,
+            'Fn::ToJsonString': self._handle_function,
         }
+        # Fn::Sub string to the names it references, many Sub strings are repeated across a template
+        self._sub_references = {}
 
     def _add_pseudo_parameters(self):
         parameters = [
             'AWS::AccountId',
             'AWS::NotificationARNs',
             'AWS::NoValue',
+            'AWS::Partition',
             'AWS::Region',
             'AWS::StackId',
-            'AWS::StackName'
+            'AWS::StackName',
+            'AWS::URLSuffix'
         ]
         for p in parameters:
             self.template.add_element(PseudoParameter(p))
@@ -277,9 +645,48 @@ class TemplateParser(object):
         Parses a template from a file per http://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/template-anatomy.html
         :param path: Full path to the template file to parse
         """
-        d = json.load(open(path))
+        with open(path) as f:
+            d = json.load(f)
         self._parse_json(d)
 
+    def parse_document(self, document):
+        """
+        Parses a template from an already decoded JSON document
+        :param document: Dictionary representing the whole template
+        """
+        self._parse_json(document)
+
+    def parse_file_incremental(self, path, chunk_size=65536):
+        """
+        Parses a template from a file without decoding the whole document at once, each parameter, resource, etc is
+        parsed as soon as its value has been read and is then discarded. The file is read twice, first to find every
+        logical id so references can be resolved in any order.
+        :param path: Full path to the template file to parse
+        :param chunk_size: Minimum number of characters to read at a time
+        """
+        logical_ids = dict((key, []) for _, key in LOGICAL_SECTIONS)
+        sections = set(logical_ids) | {'Metadata'}
+
+        document = {}
+        # Entries are skipped over in the first pass, only their keys are needed
+        for key, entry_key, value in iter_file(path, sections, chunk_size, skip_entries=True):
+            if entry_key is None:
+                document[key] = value
+            elif key in logical_ids:
+                logical_ids[key].append(entry_key)
+
+        self._parse_template(document)
+        self._add_pseudo_parameters()
+        for logical_type, key in LOGICAL_SECTIONS:
+            for k in logical_ids[key]:
+                self.template.add_element(logical_type(k))
+
+        for key, entry_key, value in iter_file(path, sections, chunk_size):
+            if entry_key is not None:
+                self._parse_entry(key, entry_key, value)
+
+        self.template.freeze()
+
     def _parse_json(self, document):
 
         # Note that order is important here, as a resource may reference a parameter or condition
@@ -287,19 +694,18 @@ class TemplateParser(object):
         self._add_pseudo_parameters()
 
         # First pass so we have everything in the template, and we can setup dependencies
-        self._pre_create_logical_elements(document, Parameter, 'Parameters')
         # Note metadata can't be referenced (isn't a logical element)
-        self._pre_create_logical_elements(document, Mapping, 'Mappings')
-        self._pre_create_logical_elements(document, Condition, 'Conditions')
-        self._pre_create_logical_elements(document, Resource, 'Resources')
-        self._pre_create_logical_elements(document, Output, 'Outputs')
+        for logical_type, key in LOGICAL_SECTIONS:
+            self._pre_create_logical_elements(document, logical_type, key)
 
         self._parse_top_level_dict(document, Parameter, 'Parameters')
         self._parse_metadata(document)
         self._parse_top_level_dict(document, Mapping, 'Mappings')
         self._parse_top_level_dict(document, Condition, 'Conditions')
         self._parse_resources(document)
-        self._parse_top_level_dict(document, Output, 'Outputs')
+        self._parse_outputs(document)
+
+        self.template.freeze()
 
     def _parse_template(self, document):
         self.template.version = document.get('AWSTemplateFormatVersion')
@@ -325,8 +731,25 @@ class TemplateParser(object):
 
         for k, v in document[key].iteritems():
             e = self.template.get_by_logical_id_typed(k, internal_type)
-            for ek, ev in v.iteritems():
-                e.add_child(self._handle_value(ek, ev))
+            self._parse_top_level_entry(e, v)
+
+    def _parse_top_level_entry(self, element, raw):
+        for ek, ev in raw.iteritems():
+            element.add_child(self._handle_value(ek, ev))
+
+    def _parse_entry(self, key, entry_key, raw):
+        """
+        Parses a single entry of a top level section, e.g. one resource, once its logical element exists
+        """
+        if key == 'Metadata':
+            self._parse_metadata_entry(entry_key, raw)
+        elif key == 'Resources':
+            self._parse_resource(self.template.get_resource(entry_key), raw)
+        elif key == 'Outputs':
+            self._parse_output(self.template.get_by_logical_id_typed(entry_key, Output), raw)
+        else:
+            logical_type = next(t for t, k in LOGICAL_SECTIONS if k == key)
+            self._parse_top_level_entry(self.template.get_by_logical_id_typed(entry_key, logical_type), raw)
 
     def _handle_function_ref(self, function, logical_name):
         """
@@ -338,9 +761,13 @@ class TemplateParser(object):
 
     def _handle_function_get_att(self, function, values):
         """
-        Handle GetAtt functions which can reference other logical items
+        Handle GetAtt functions which can reference other logical items, either as ["Name", "Attribute"] or
+        "Name.Attribute"
         """
-        item = self.template.get_by_logical_id(values[0])
+        if isinstance(values, basestring):
+            item = self.template.get_by_logical_id(values.split('.', 1)[0])
+        else:
+            item = self.template.get_by_logical_id(values[0])
         function.add_dependency(item)
         function.add_child(self._handle_value(None, values))
 
@@ -371,6 +798,48 @@ class TemplateParser(object):
         function.add_dependency(condition)
         function.add_child(self._handle_value(None, values))
 
+    def _get_sub_references(self, string):
+        """
+        Returns the logical ids referenced by a Fn::Sub string, e.g. "${Name}" or "${Name.Attribute}"
+        """
+        references = self._sub_references.get(string)
+        if references is None:
+            references = []
+            for m in SUB_REFERENCE_PATTERN.findall(string):
+                logical_id = m.split('.', 1)[0]
+                if logical_id not in references:
+                    references.append(logical_id)
+            references = tuple(references)
+            self._sub_references[string] = references
+        return references
+
+    def _handle_function_sub(self, function, values):
+        """
+        Handle Sub functions which can reference logical items from within the string, either as "string" or
+        ["string", {"Variable": value}] where the variables shadow logical ids.
+        See http://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/intrinsic-function-reference-sub.html
+        """
+        variables = {}
+        if isinstance(values, basestring):
+            string = values
+        else:
+            string = values[0]
+            if len(values) > 1 and isinstance(values[1], dict):
+                variables = values[1]
+
+        if isinstance(string, basestring):
+            for logical_id in self._get_sub_references(string):
+                if logical_id not in variables:
+                    function.add_dependency(self.template.get_by_logical_id(logical_id))
+        function.add_child(self._handle_value(None, values))
+
+    def _handle_function_import_value(self, function, values):
+        """
+        Handle ImportValue functions, keeping the export name so imports can be matched to exports across templates
+        """
+        function.import_name = values
+        function.add_child(self._handle_value(None, values))
+
     def _handle_function(self, function, values):
         """
         Handles remaining intrinsic functions
@@ -385,11 +854,13 @@ class TemplateParser(object):
         :param follow_dependencies: Whether or not dependencies should be followed, if false conditions and functions are ignored.
         :return: The element which key and value represent
         """
-        if isinstance(value, basestring) or isinstance(value, int) or isinstance(bool, int):
+        # Each element is frozen once it's complete, so freezing the template only walks the logical elements
+        if isinstance(value, (basestring, int, long, float, bool)) or value is None:
             p = Property(key, value)
             # Add a dependency with the condition
             if follow_dependencies and key == "Condition":
                 p.add_dependency(self.template.get_by_logical_id(value))
+            _freeze_element(p)
             return p
         elif isinstance(value, list):
             s = Element(ElementType.list)
@@ -397,6 +868,7 @@ class TemplateParser(object):
             for nested_value in value:
                 s.add_child(self._handle_value(i, nested_value, follow_dependencies))
                 i += 1
+            _freeze_element(s)
             return s
         elif isinstance(value, dict):
             k = Key(key)
@@ -405,9 +877,11 @@ class TemplateParser(object):
                     f = Function(vk)
                     handler = self.known_functions[vk]
                     handler(f, vv)
+                    _freeze_element(f)
                     k.add_child(f)
                 else:
                     k.add_child(self._handle_value(vk, vv, follow_dependencies))
+            _freeze_element(k)
             return k
 
     def _parse_resource(self, resource, raw):
@@ -432,12 +906,33 @@ class TemplateParser(object):
             r = self.template.get_resource(k)
             self._parse_resource(r, v)
 
+    def _parse_output(self, output, raw):
+        export = raw.get('Export')
+        if isinstance(export, dict):
+            output.raw_export_name = export.get('Name')
+            if isinstance(output.raw_export_name, basestring):
+                output.export_name = output.raw_export_name
+
+        for ok, ov in raw.iteritems():
+            output.add_child(self._handle_value(ok, ov))
+
+    def _parse_outputs(self, document):
+        outputs = document.get('Outputs')
+
+        if not outputs is None:
+            for k, v in outputs.iteritems():
+                o = self.template.get_by_logical_id_typed(k, Output)
+                self._parse_output(o, v)
+
     def _parse_metadata(self, document):
         metadata = document.get('Metadata')
 
         if not metadata is None:
             for k, v in metadata.iteritems():
-                e = Metadata(k)
-                self.template.add_element(e)
-                e.add_child(self._handle_value(None, v, False))
+                self._parse_metadata_entry(k, v)
+
+    def _parse_metadata_entry(self, key, raw):
+        e = Metadata(key)
+        self.template.add_element(e)
+        e.add_child(self._handle_value(None, raw, False))
 
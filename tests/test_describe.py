@@ -0,0 +1,54 @@
+from cfnplan import Template, ElementType
+from cfnplan.describe import Describer
+import os
+import unittest
+
+
+class DescriberTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), 'templates')
+
+    def test_matches_visit_dependencies(self):
+        for name in sorted(os.listdir(self.test_data_dir)):
+            # Arrange
+            t = Template.parse_file(os.path.join(self.test_data_dir, name))
+            describer = Describer()
+
+            for e in t.elements:
+                if e.element_type != ElementType.resource:
+                    continue
+                expected = []
+                e.visit_dependencies(lambda item, level, visited: expected.append((level, str(item))))
+
+                # Act
+                actual = []
+                describer.visit(e, lambda item, level, visited: actual.append((level, str(item))), verbose=True)
+                flat = []
+                describer.visit(e, lambda item, level, visited: flat.append(item))
+
+                # Assert
+                self.assertEqual(sorted(expected), sorted(actual))
+                self.assertEqual(len(flat), len(set(flat)))
+                self.assertSetEqual(e.get_all_dependencies(), set(flat))
+
+    def test_dependencies_are_ordered_depth_first(self):
+        # Arrange
+        raw = '''
+        {
+            "Parameters": {
+                "Name": {"Type": "String"}
+            },
+            "Resources": {
+                "A": {"Type": "AWS::SNS::Topic", "DependsOn": ["B", "C"]},
+                "B": {"Type": "AWS::SNS::Topic", "Properties": {"TopicName": {"Ref": "Name"}}},
+                "C": {"Type": "AWS::SNS::Topic", "DependsOn": "B"}
+            }
+        }
+        '''
+        t = Template.parse_string(raw)
+
+        # Act
+        ordered = Describer().get_ordered_dependencies(t.get_resource('A'))
+
+        # Assert
+        self.assertEqual(['B', 'Name', 'C'], [e.logical_id for e in ordered])
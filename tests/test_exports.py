@@ -0,0 +1,135 @@
+from cfnplan.exports import ExportIndex
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class ExportIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_template(self, name, resources, outputs=None):
+        document = {'Resources': resources}
+        if outputs is not None:
+            document['Outputs'] = outputs
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump(document, f)
+
+    def write_network(self):
+        self.write_template(
+            'network.template',
+            {'Subnet': {'Type': 'AWS::EC2::Subnet'}},
+            {'SubnetId': {'Value': {'Ref': 'Subnet'}, 'Export': {'Name': 'network-SubnetId'}}})
+
+    def write_app(self, name, logical_id):
+        self.write_template(
+            name,
+            {logical_id: {
+                'Type': 'AWS::EC2::Instance',
+                'Properties': {'SubnetId': {'Fn::ImportValue': 'network-SubnetId'}}}})
+
+    def test_producers_and_consumers(self):
+        # Arrange
+        self.write_network()
+        self.write_app('app.template', 'Instance')
+        self.write_app('nested/other.json', 'OtherInstance')
+        with open(os.path.join(self.directory, 'package.json'), 'w') as f:
+            json.dump({'name': 'not-a-template'}, f)
+
+        # Act
+        index = ExportIndex()
+        changed = index.update(self.directory, processes=2)
+
+        # Assert
+        self.assertEqual(['app.template', 'nested/other.json', 'network.template', 'package.json'], changed)
+        self.assertEqual(['network-SubnetId'], index.export_names())
+        self.assertEqual([('network.template', 'SubnetId')], index.producers('network-SubnetId'))
+        self.assertEqual([('app.template', 'Instance'), ('nested/other.json', 'OtherInstance')],
+                         index.consumers('network-SubnetId'))
+        self.assertEqual(index.consumers('network-SubnetId'),
+                         index.dependents_of_output('network.template', 'SubnetId'))
+        self.assertEqual([], index.consumers('unknown'))
+
+    def test_incremental_update(self):
+        # Arrange
+        index_path = os.path.join(self.directory, '.cfnplan-index')
+        self.write_network()
+        self.write_app('app.template', 'Instance')
+        index = ExportIndex()
+        index.update(self.directory, processes=1)
+        index.save(index_path)
+
+        # Act
+        self.write_app('app.template', 'RenamedInstance')
+        os.remove(os.path.join(self.directory, 'network.template'))
+        index = ExportIndex.load(index_path)
+        changed = index.update(self.directory, processes=1)
+
+        # Assert
+        self.assertEqual(['app.template'], changed)
+        self.assertEqual([], index.producers('network-SubnetId'))
+        self.assertEqual([('app.template', 'RenamedInstance')], index.consumers('network-SubnetId'))
+
+    def test_invalid_templates_are_recorded(self):
+        # Arrange
+        self.write_network()
+        self.write_app('app.template', 'Instance')
+        with open(os.path.join(self.directory, 'broken.json'), 'w') as f:
+            f.write('{not json')
+        self.write_template('dangling.template', {'Topic': {'Type': 'AWS::SNS::Topic', 'DependsOn': 'Missing'}})
+
+        # Act
+        index = ExportIndex()
+        changed = index.update(self.directory, processes=2)
+        unchanged = index.update(self.directory, processes=1)
+
+        # Assert
+        self.assertEqual(4, len(changed))
+        self.assertEqual([], unchanged)
+        errors = dict(index.errors())
+        self.assertEqual(['broken.json', 'dangling.template'], sorted(errors))
+        self.assertIn('Expecting property name', errors['broken.json'])
+        self.assertIn('Missing', errors['dangling.template'])
+        self.assertEqual([('app.template', 'Instance')], index.consumers('network-SubnetId'))
+
+    def test_unresolved_names(self):
+        # Arrange
+        self.write_template(
+            'network.template',
+            {'Vpc': {'Type': 'AWS::EC2::VPC'}, 'Subnet': {'Type': 'AWS::EC2::Subnet'}},
+            {
+                'VpcId': {'Value': {'Ref': 'Vpc'}, 'Export': {'Name': {'Fn::Sub': '${AWS::StackName}-VpcId'}}},
+                'SubnetId': {
+                    'Value': {'Ref': 'Subnet'},
+                    'Export': {'Name': {'Fn::Join': ['-', [{'Ref': 'AWS::StackName'}, 'SubnetId']]}}},
+            })
+        region_vpc = {'Fn::Sub': '${AWS::Region}-VpcId'}
+        self.write_template('app.template', {
+            'Group': {'Type': 'AWS::EC2::SecurityGroup', 'Properties': {'VpcId': {'Fn::ImportValue': region_vpc}}},
+            'Instance': {
+                'Type': 'AWS::EC2::Instance',
+                'Properties': {'SubnetId': {'Fn::ImportValue': {'Fn::Sub': 'network-SubnetId'}}}},
+        })
+        index = ExportIndex()
+
+        # Act
+        index.update(self.directory, processes=1)
+        unresolved_exports = index.unresolved_exports()
+        changed = index.update(self.directory, processes=1, stack_names={'network.template': 'network'})
+
+        # Assert
+        self.assertEqual([('network.template', 'SubnetId'), ('network.template', 'VpcId')],
+                         [x[:2] for x in unresolved_exports])
+        self.assertEqual(['network.template'], changed)
+        self.assertEqual([], index.unresolved_exports())
+        self.assertEqual([('app.template', 'Group', region_vpc)], index.unresolved_imports())
+        self.assertEqual(['network-SubnetId', 'network-VpcId'], index.export_names())
+        self.assertEqual([('app.template', 'Instance')], index.dependents_of_output('network.template', 'SubnetId'))
@@ -0,0 +1,66 @@
+from cfnplan import Template, ElementType
+from cfnplan.reachability import ReachabilityMatrix
+from cfnplan.template import CircularDependencyError, LogicalIdNotFoundError
+import os
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ReachabilityMatrixTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), 'templates')
+        self.template = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        self.matrix = ReachabilityMatrix(self.template)
+
+    def test_matches_get_all_dependencies(self):
+        for e in self.template.get_logical_elements():
+            expected = set(d.logical_id for d in e.get_all_dependencies())
+            self.assertSetEqual(expected, set(self.matrix.get_dependencies(e.logical_id)))
+
+    def test_bulk_queries(self):
+        # Arrange
+        instances = self.matrix.resources_of_type('AWS::RDS::DBInstance')
+        groups = self.matrix.resources_of_type('AWS::EC2::SecurityGroup')
+
+        # Act & Assert
+        self.assertEqual(['DBInstance'], instances)
+        self.assertSetEqual({'WebServerSecurityGroup', 'DBEC2SecurityGroup'}, set(groups))
+        self.assertTrue(self.matrix.depends_on('DBInstance', 'WebServerSecurityGroup'))
+        self.assertFalse(self.matrix.depends_on('WebServerSecurityGroup', 'DBInstance'))
+        self.assertTrue(self.matrix.depends_on_any(instances, groups))
+        self.assertFalse(self.matrix.depends_on_any(groups, instances))
+        self.assertSetEqual({('DBInstance', 'WebServerSecurityGroup'), ('DBInstance', 'DBEC2SecurityGroup')},
+                            set(self.matrix.reachable_between(instances, groups)))
+        self.assertEqual(2, self.matrix.count_by_resource_type('DBInstance')['AWS::EC2::SecurityGroup'])
+        self.assertEqual(7, self.matrix.count_by_element_type('DBInstance')[ElementType.parameter])
+
+    def test_unknown_logical_id(self):
+        self.assertRaises(LogicalIdNotFoundError, self.matrix.get_dependencies, 'Missing')
+        self.assertRaises(LogicalIdNotFoundError, self.matrix.depends_on, 'DBInstance', 'Missing')
+        self.assertRaises(LogicalIdNotFoundError, self.matrix.depends_on_any, ['DBInstance'], ['Missing'])
+        self.assertRaises(LogicalIdNotFoundError, self.matrix.count_by_resource_type, 'Missing')
+
+    def test_circular_dependency(self):
+        # Arrange
+        raw = '''
+        {
+            "Resources": {
+                "A": {"Type": "AWS::SNS::Topic", "DependsOn": "B"},
+                "B": {"Type": "AWS::SNS::Topic", "DependsOn": "A"}
+            }
+        }
+        '''
+        t = Template.parse_string(raw)
+
+        # Act & Assert
+        self.assertRaises(CircularDependencyError, ReachabilityMatrix, t)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy(self):
+        matrix = self.matrix.to_numpy()
+        i = [e.logical_id for e in self.matrix.elements].index('DBInstance')
+        self.assertEqual(len(self.matrix.get_dependencies('DBInstance')), matrix[i].sum())
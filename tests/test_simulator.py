@@ -0,0 +1,127 @@
+from cfnplan import Template
+from cfnplan.simulator import DeploySimulator, DurationModel, UPDATE, REPLACE
+from cfnplan.template import CircularDependencyError
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class DeploySimulatorTestCase(unittest.TestCase):
+    def setUp(self):
+        raw = '''
+        {
+            "Parameters": {
+                "Name": {"Type": "String"}
+            },
+            "Conditions": {
+                "HasBucket": {"Fn::Equals": [{"Ref": "Bucket"}, ""]}
+            },
+            "Resources": {
+                "Bucket": {"Type": "Test::Bucket"},
+                "Role": {"Type": "Test::Role", "Properties": {"Name": {"Ref": "Name"}}},
+                "Function": {
+                    "Type": "Test::Function",
+                    "Properties": {
+                        "Role": {"Fn::GetAtt": ["Role", "Arn"]},
+                        "Code": {"Fn::If": ["HasBucket", "a", "b"]}
+                    }
+                },
+                "Queue": {"Type": "Test::Queue"}
+            }
+        }
+        '''
+        self.template = Template.parse_string(raw)
+        self.model = DurationModel({
+            'Test::Bucket': (10, 1, 20),
+            'Test::Role': (30, 3, 30),
+            'Test::Function': (5, 2, 8),
+            'Test::Queue': (60, 6, 60),
+        })
+
+    def test_create(self):
+        # Act
+        result = DeploySimulator(self.template, self.model).simulate_create()
+
+        # Assert
+        self.assertEqual(60, result.total_time)
+        self.assertEqual(['Queue'], [r.logical_id for r in result.slowest_chain])
+        function = self.template.get_resource('Function')
+        self.assertEqual(('create', 30, 35), result.timings[function])
+        self.assertEqual([3, 1], [len(w.resources) for w in result.waves])
+        self.assertAlmostEqual((10 + 30 + 60) / 180.0, result.waves[0].utilisation)
+
+    def test_update(self):
+        # Act
+        result = DeploySimulator(self.template, self.model).simulate_update({'Bucket': REPLACE, 'Function': UPDATE})
+
+        # Assert
+        self.assertEqual(22, result.total_time)
+        self.assertEqual(['Bucket', 'Function'], [r.logical_id for r in result.slowest_chain])
+        self.assertEqual((None, 0, 0), result.timings[self.template.get_resource('Queue')])
+        self.assertEqual(['Queue', 'Role'], sorted(r.logical_id for r in result.unchanged))
+        self.assertEqual([['Bucket'], ['Function']], [[r.logical_id for r in w.resources] for w in result.waves])
+        self.assertEqual([(0, 20), (20, 22)], [(w.start, w.end) for w in result.waves])
+        self.assertEqual([1.0, 1.0], [w.utilisation for w in result.waves])
+
+    def test_update_without_work(self):
+        # Arrange
+        self.model.durations['Test::Queue'] = (60, 0, 60)
+
+        # Act
+        unchanged = DeploySimulator(self.template, self.model).simulate_update({})
+        instant = DeploySimulator(self.template, self.model).simulate_update({'Queue': UPDATE})
+
+        # Assert
+        self.assertEqual(0, unchanged.total_time)
+        self.assertEqual([], unchanged.slowest_chain)
+        self.assertEqual([], unchanged.waves)
+        self.assertEqual(['Queue'], [r.logical_id for r in instant.slowest_chain])
+        self.assertEqual([0.0], [w.utilisation for w in instant.waves])
+
+    def test_many_resources(self):
+        # Arrange, a chain of 100 resources with 20 dependents each
+        resources = {}
+        for i in range(100):
+            resources['Chain%d' % i] = {'Type': 'AWS::SNS::Topic', 'DependsOn': ['Chain%d' % (i - 1)] if i else []}
+            for j in range(20):
+                resources['Leaf%d_%d' % (i, j)] = {'Type': 'AWS::SQS::Queue', 'DependsOn': 'Chain%d' % i}
+        t = Template.parse_string(json.dumps({'Resources': resources}))
+
+        # Act
+        result = DeploySimulator(t).simulate_create()
+
+        # Assert
+        self.assertEqual(100 * 5 + 60, result.total_time)
+        self.assertEqual(101, len(result.slowest_chain))
+        self.assertEqual(101, len(result.waves))
+
+    def test_circular_dependency(self):
+        raw = '''
+        {
+            "Resources": {
+                "A": {"Type": "AWS::SNS::Topic", "DependsOn": "B"},
+                "B": {"Type": "AWS::SNS::Topic", "DependsOn": "A"}
+            }
+        }
+        '''
+        self.assertRaises(CircularDependencyError, DeploySimulator(Template.parse_string(raw)).simulate_create)
+
+    def test_load_model(self):
+        # Arrange
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'model.json')
+        with open(path, 'w') as f:
+            json.dump({'AWS::SNS::Topic': {'create': 2}, 'Test::Queue': {'update': 4}, 'default': {'replace': 7}}, f)
+
+        # Act
+        model = DurationModel.load(path)
+
+        # Assert
+        self.assertEqual(2, model.duration('AWS::SNS::Topic', 'create'))
+        self.assertEqual(5, model.duration('AWS::SNS::Topic', 'update'))
+        self.assertEqual(4, model.duration('Test::Queue', 'update'))
+        self.assertEqual(7, model.duration('Test::Unknown', 'replace'))
+        self.assertEqual(600, model.duration('AWS::RDS::DBInstance', 'create'))
@@ -0,0 +1,45 @@
+from cfnplan import Template, ElementType
+from cfnplan.template import LogicalIdNotFoundError
+from cfnplan.snapshot import GraphSnapshot, SnapshotFormatError
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class GraphSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), 'templates')
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'graph.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        # Arrange
+        t = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        db_instance = t.get_resource('DBInstance')
+
+        # Act
+        t.save_snapshot(self.path)
+        with Template.load_snapshot(self.path) as snapshot:
+            # Assert
+            self.assertEqual(len(t.get_logical_elements()), len(snapshot))
+            index = snapshot.index_of('DBInstance')
+            self.assertEqual('DBInstance', snapshot.logical_id(index))
+            self.assertEqual(ElementType.resource, snapshot.element_type(index))
+            self.assertEqual('AWS::RDS::DBInstance', snapshot.resource_type(index))
+            self.assertEqual(sorted(d.logical_id for d in db_instance.get_direct_dependencies()),
+                             snapshot.get_dependencies('DBInstance'))
+            self.assertIn('DBInstance', snapshot.get_dependents('DBSecurityGroup'))
+            self.assertIsNone(snapshot.resource_type(snapshot.index_of('AWS::Region')))
+            self.assertRaises(LogicalIdNotFoundError, snapshot.index_of, 'Missing')
+
+            rebuilt = snapshot.to_template()
+            expected = set(r.logical_id for r in db_instance.get_all_dependencies())
+            actual = set(r.logical_id for r in rebuilt.get_resource('DBInstance').get_all_dependencies())
+            self.assertSetEqual(expected, actual)
+
+    def test_invalid_snapshot(self):
+        self.assertRaises(SnapshotFormatError, GraphSnapshot, b'NOPE' + b'\0' * 16)
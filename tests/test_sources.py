@@ -0,0 +1,113 @@
+from cfnplan.sources import SourceLoader, TemplateFetchError
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+import os
+import threading
+import unittest
+
+
+class TemplateServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TemplateRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+        name = self.path.lstrip('/')
+        if name not in server.templates:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        etag = '"%d"' % server.versions.get(name, 0)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = server.templates[name]
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SourceLoaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.test_data_dir = os.path.join(os.path.dirname(__file__), 'templates')
+        self.names = sorted(os.listdir(self.test_data_dir))
+
+        self.server = TemplateServer(('127.0.0.1', 0), TemplateRequestHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.versions = {}
+        self.server.templates = {}
+        for name in self.names:
+            with open(os.path.join(self.test_data_dir, name), 'rb') as f:
+                self.server.templates[name] = f.read()
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        self.loader = SourceLoader(max_concurrency=2)
+
+    def tearDown(self):
+        self.loader.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_load_file(self):
+        path = os.path.join(self.test_data_dir, 'single_server.template')
+
+        t = self.loader.load(path)
+        url_template = self.loader.load('file://' + path)
+
+        self.assertEqual('AWS::EC2::Instance', t.get_resource('SharePointFoundation').resource_type)
+        self.assertIsNot(t, url_template)
+        # Unchanged files aren't parsed again
+        self.assertIs(t, self.loader.load(path))
+
+    def test_load_many_http(self):
+        # Act
+        urls = [self.base_url + name for name in self.names]
+        templates = self.loader.load_many(urls)
+
+        # Assert
+        self.assertEqual(set(urls), set(templates))
+        wordpress = templates[self.base_url + 'WordPress_Multi_AZ.template']
+        self.assertEqual('AWS::RDS::DBInstance', wordpress.get_resource('DBInstance').resource_type)
+        # Connections are kept alive between requests
+        self.assertEqual(len(self.names), len(self.server.requests))
+        self.assertTrue(len(self.server.connections) <= 2)
+
+    def test_conditional_requests(self):
+        # Arrange
+        url = self.base_url + 'conditions.template'
+        first = self.loader.load(url)
+
+        # Act
+        unchanged = self.loader.load(url)
+        self.server.versions['conditions.template'] = 1
+        changed = self.loader.load(url)
+
+        # Assert
+        self.assertIs(first, unchanged)
+        self.assertIsNot(first, changed)
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_not_found(self):
+        with self.assertRaises(TemplateFetchError) as context:
+            self.loader.load(self.base_url + 'missing.template')
+        self.assertEqual(404, context.exception.status)
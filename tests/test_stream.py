@@ -0,0 +1,73 @@
+from cfnplan.stream import iter_top_level
+import io
+import unittest
+
+
+class IterTopLevelTestCase(unittest.TestCase):
+    def iterate(self, raw, chunk_size=1, skip_entries=False):
+        return list(iter_top_level(io.StringIO(raw), {'Resources', 'Empty'}, chunk_size, skip_entries))
+
+    def test_sections_are_iterated_by_entry(self):
+        # Arrange
+        raw = u'''
+        {
+            "Description": "caf\u00e9",
+            "Count": 12345,
+            "Resources": {
+                "A": {"Type": "AWS::SNS::Topic", "Properties": {"Values": [1, 2.5, true, null]}},
+                "B": 678
+            },
+            "Empty": {},
+            "Other": {"Nested": {"Key": "Value"}}
+        }
+        '''
+
+        # Act & Assert
+        for chunk_size in (1, 7, 65536):
+            self.assertEqual([
+                ('Description', None, u'caf\u00e9'),
+                ('Count', None, 12345),
+                ('Resources', 'A', {'Type': 'AWS::SNS::Topic', 'Properties': {'Values': [1, 2.5, True, None]}}),
+                ('Resources', 'B', 678),
+                ('Other', None, {'Nested': {'Key': 'Value'}}),
+            ], self.iterate(raw, chunk_size))
+
+    def test_number_split_between_chunks(self):
+        for chunk_size in range(1, 16):
+            self.assertEqual([('Count', None, 1.5), ('Size', None, -2e+10)],
+                             self.iterate(u'{"Count": 1.5, "Size": -2e+10}', chunk_size))
+
+    def test_empty_object(self):
+        self.assertEqual([], self.iterate(u' { } '))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.iterate, u'{"Resources": {"A": {"Type": }}}')
+        self.assertRaises(ValueError, self.iterate, u'{"Resources": {"A": 1}')
+        self.assertRaises(ValueError, self.iterate, u'[]')
+
+    def test_skipped_entries(self):
+        # Arrange
+        raw = u'''
+        {
+            "Resources": {
+                "A": {"Properties": {"Name": "quote \\" and } brace", "Path": "C:\\\\", "List": [[1], {"B": "]"}]}},
+                "B": 678,
+                "C": "[{",
+                "D": true
+            },
+            "Count": 12345
+        }
+        '''
+
+        # Act & Assert
+        for chunk_size in (1, 7, 65536):
+            self.assertEqual([
+                ('Resources', 'A', None),
+                ('Resources', 'B', None),
+                ('Resources', 'C', None),
+                ('Resources', 'D', None),
+                ('Count', None, 12345),
+            ], self.iterate(raw, chunk_size, skip_entries=True))
+
+    def test_skipped_entry_unterminated(self):
+        self.assertRaises(ValueError, self.iterate, u'{"Resources": {"A": {"B": "}}}', 1, True)
@@ -1,4 +1,5 @@
-from cfnplan import Template, ElementType
+from cfnplan import Template, ElementType, Direction
+from cfnplan.template import Element, Parameter, FrozenTemplateError, TemplateParser
 import unittest
 import os
 
@@ -405,3 +406,245 @@ class TemplateParserTestCase(unittest.TestCase):
         self.assertEqual(1, len(join_function.children))
         grand_children = join_function.children[0]
         self.assertEqual(ElementType.list, grand_children.element_type)
+
+    def test_output_export_and_import_value(self):
+        # Arrange
+        raw = '''
+        {
+            "Resources": {
+                "Instance": {
+                    "Type" : "AWS::EC2::Instance",
+                    "Properties": {
+                        "SubnetId": {"Fn::ImportValue": "network-SubnetId"}
+                    }
+                }
+            },
+            "Outputs": {
+                "InstanceId": {
+                    "Value": {"Ref": "Instance"},
+                    "Export": {"Name": "app-InstanceId"}
+                },
+                "NotExported": {
+                    "Value": {"Ref": "Instance"}
+                }
+            }
+        }
+        '''
+
+        # Act
+        t = Template.parse_string(raw)
+
+        # Assert
+        exports = t.get_exports()
+        self.assertEqual(['app-InstanceId'], list(exports))
+        self.assertEqual('InstanceId', exports['app-InstanceId'].logical_id)
+        self.assertEqual('Instance', list(exports['app-InstanceId'].get_all_dependencies())[0].logical_id)
+        imports = t.get_imports()
+        self.assertEqual(1, len(imports))
+        self.assertEqual('Instance', imports[0][0].logical_id)
+        self.assertEqual('network-SubnetId', imports[0][1])
+
+    def test_function_fn_sub(self):
+        # Arrange
+        raw = '''
+        {
+            "Parameters": {
+                "Prefix": {"Type": "String"}
+            },
+            "Resources": {
+                "Bucket": {
+                    "Type": "AWS::S3::Bucket",
+                    "Properties": {
+                        "BucketName": {"Fn::Sub": "${Prefix}-${AWS::Region}-${!Literal}-${Prefix}"}
+                    }
+                },
+                "Queue": {
+                    "Type": "AWS::SQS::Queue",
+                    "Properties": {
+                        "QueueName": {
+                            "Fn::Sub": [
+                                "${Bucket.Arn}-${Name}",
+                                {"Name": {"Ref": "Prefix"}}
+                            ]
+                        }
+                    }
+                }
+            }
+        }
+        '''
+
+        # Act
+        t = Template.parse_string(raw)
+
+        # Assert
+        bucket = set(d.logical_id for d in t.get_resource('Bucket').get_all_dependencies())
+        self.assertSetEqual({'Prefix', 'AWS::Region'}, bucket)
+        queue = set(d.logical_id for d in t.get_resource('Queue').get_all_dependencies())
+        self.assertSetEqual({'Bucket', 'Prefix', 'AWS::Region'}, queue)
+
+    def test_function_fn_get_att_dotted(self):
+        # Arrange
+        raw = '''
+        {
+            "Resources": {
+                "Bucket": {
+                    "Type": "AWS::S3::Bucket"
+                },
+                "Queue": {
+                    "Type": "AWS::SQS::Queue",
+                    "Properties": {
+                        "QueueName": {"Fn::GetAtt": "Bucket.Arn"}
+                    }
+                }
+            }
+        }
+        '''
+
+        # Act
+        t = Template.parse_string(raw)
+
+        # Assert
+        dependencies = list(t.get_resource('Queue').get_all_dependencies())
+        self.assertEqual(1, len(dependencies))
+        self.assertEqual('Bucket', dependencies[0].logical_id)
+
+    def test_modern_functions(self):
+        # Arrange
+        raw = '''
+        {
+            "Parameters": {
+                "VpcCidr": {"Type": "String"},
+                "Names": {"Type": "String"}
+            },
+            "Resources": {
+                "Subnet": {
+                    "Type": "AWS::EC2::Subnet",
+                    "Properties": {
+                        "CidrBlock": {"Fn::Select": [0, {"Fn::Cidr": [{"Ref": "VpcCidr"}, 2, 8]}]},
+                        "Tags": {"Fn::Split": [",", {"Ref": "Names"}]},
+                        "VpcId": {"Fn::ImportValue": {"Fn::Sub": "${AWS::StackName}-VpcId"}},
+                        "Transformed": {"Fn::Transform": {"Name": "AWS::Include", "Parameters": {"Location": "s3://x"}}}
+                    }
+                }
+            }
+        }
+        '''
+
+        # Act
+        t = Template.parse_string(raw)
+
+        # Assert
+        subnet = t.get_resource('Subnet')
+        names = set(c.name for c in subnet.get_all_children() if c.element_type == ElementType.function)
+        self.assertSetEqual({'Fn::Select', 'Fn::Cidr', 'Fn::Split', 'Fn::ImportValue', 'Fn::Sub', 'Fn::Transform', 'Ref'},
+                            names)
+        dependencies = set(d.logical_id for d in subnet.get_all_dependencies())
+        self.assertSetEqual({'VpcCidr', 'Names', 'AWS::StackName'}, dependencies)
+
+    def test_subgraph_dependencies(self):
+        # Arrange
+        t = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        db_instance = t.get_resource('DBInstance')
+
+        # Act
+        view = t.subgraph(['DBInstance'])
+        shallow = t.subgraph(['DBInstance'], depth=1)
+
+        # Assert
+        expected = set(d.logical_id for d in db_instance.get_all_dependencies())
+        self.assertSetEqual(expected | {'DBInstance'}, set(view.get_logical_ids()))
+        self.assertEqual([db_instance], view.roots)
+        self.assertEqual(0, view.levels[db_instance])
+        self.assertNotIn(t.get_resource('WebServerGroup'), view)
+        direct = set(d.logical_id for d in db_instance.get_direct_dependencies())
+        self.assertSetEqual(direct | {'DBInstance'}, set(shallow.get_logical_ids()))
+
+    def test_subgraph_dependents(self):
+        # Arrange
+        t = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        expected = {
+            'WebServerSecurityGroup',
+            'DBSecurityGroup',
+            'DBEC2SecurityGroup',
+            'DBInstance',
+            'LaunchConfig',
+            'WebServerGroup'
+        }
+
+        # Act
+        view = t.subgraph(['WebServerSecurityGroup'], Direction.dependents)
+
+        # Assert
+        self.assertSetEqual(expected, set(view.get_logical_ids()))
+        visited = []
+        view.visit(view.roots[0], lambda e, level, is_visited: visited.append(e.logical_id))
+        self.assertSetEqual(expected - {'WebServerSecurityGroup'}, set(visited))
+
+    def test_parsed_template_is_frozen(self):
+        # Arrange
+        t = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        db_instance = t.get_resource('DBInstance')
+
+        # Act & Assert
+        self.assertTrue(t.frozen)
+        self.assertTrue(all(c.frozen for c in db_instance.get_all_children()))
+        self.assertIsInstance(t.elements, tuple)
+        self.assertIsInstance(db_instance.children, tuple)
+        self.assertIsInstance(db_instance.get_all_dependencies(), frozenset)
+        self.assertIs(db_instance.get_all_dependencies(), db_instance.get_all_dependencies())
+        self.assertRaises(FrozenTemplateError, db_instance.add_child, Element(ElementType.raw))
+        self.assertRaises(FrozenTemplateError, db_instance.add_dependency, t.get_resource('DBSecurityGroup'))
+        self.assertRaises(FrozenTemplateError, setattr, db_instance, 'resource_type', 'AWS::SNS::Topic')
+        self.assertRaises(FrozenTemplateError, t.add_element, Parameter('New'))
+
+    def test_scalar_values(self):
+        # Arrange
+        raw = '{"Resources": {"A": {"Type": "X", "Properties": {"F": 1.5, "N": null, "B": true, "I": 2}}}}'
+
+        # Act
+        t = Template.parse_string(raw)
+
+        # Assert
+        properties = [c for c in t.get_resource('A').get_all_children() if c.element_type == ElementType.property]
+        self.assertEqual({'Type': 'X', 'F': 1.5, 'N': None, 'B': True, 'I': 2},
+                         dict((p.key, p.value) for p in properties))
+
+    def test_thaw(self):
+        # Arrange
+        t = Template.parse_file(os.path.join(self.test_data_dir, 'WordPress_Multi_AZ.template'))
+        expected = set(d.logical_id for d in t.get_resource('DBInstance').get_all_dependencies())
+
+        # Act
+        thawed = t.thaw()
+        db_instance = thawed.get_resource('DBInstance')
+        parameter = Parameter('New')
+        thawed.add_element(parameter)
+        db_instance.add_dependency(parameter)
+        thawed.freeze()
+
+        # Assert
+        self.assertFalse(t.get_resource('DBInstance').get_all_dependencies() & set(thawed.elements))
+        self.assertSetEqual(expected | {'New'}, set(d.logical_id for d in db_instance.get_all_dependencies()))
+        self.assertSetEqual(expected, set(d.logical_id for d in t.get_resource('DBInstance').get_all_dependencies()))
+        self.assertEqual((db_instance,), thawed.get_dependents(parameter))
+
+    def test_parse_file_incremental(self):
+        for name in sorted(os.listdir(self.test_data_dir)):
+            # Arrange
+            path = os.path.join(self.test_data_dir, name)
+            expected = Template.parse_file(path)
+
+            # Act
+            parser = TemplateParser()
+            parser.parse_file_incremental(path, chunk_size=64)
+            t = parser.template
+
+            # Assert
+            self.assertEqual(expected.description, t.description)
+            def describe(template):
+                return sorted((type(e).__name__, getattr(e, 'logical_id', None) or e.key) for e in template.elements)
+            self.assertEqual(describe(expected), describe(t))
+            for e in expected.get_logical_elements():
+                expected_ids = set(d.logical_id for d in e.get_all_dependencies())
+                actual_ids = set(d.logical_id for d in t.get_by_logical_id(e.logical_id).get_all_dependencies())
+                self.assertSetEqual(expected_ids, actual_ids)